@@ -235,8 +235,65 @@ tokenchain = [
 ]
 
 
+# patterns looking behind where they start are searched for in a slice of the
+# paragraph, as they would be in the recursion, rather than between positions
+tokenslices = ["(?<" in token[1].pattern for token in tokenchain]
+
+
 # this handles the chain of tokenization of a paragraph
 class PhraseTokenize:
+    singlepass = True
+
+    # the same tokens as TokenizePhraseRecurse, found in one pass along the
+    # paragraph.  the next match of each token from where we have got to is
+    # kept, and only searched for again once we have gone past its start.
+    # each in turn is cut off by the next match of those before it in the
+    # chain, which take precedence, so the last one still left comes first.
+    def TokenizePhrase(self, stex):
+        nexttokens = [(-1, -1, None)] * len(tokenchain)
+        pos = 0
+        while pos < len(stex):
+            end = len(stex)
+            found = None
+            for itc in range(len(tokenchain)):
+                if tokenslices[itc]:
+                    mtoken = tokenchain[itc][1].search(stex[pos:end])
+                    if mtoken:
+                        found = (itc, pos + mtoken.span(0)[0], mtoken)
+                        end = found[1]
+                    continue
+
+                if nexttokens[itc][0] < pos:
+                    mtoken = tokenchain[itc][1].search(stex, pos)
+                    if mtoken:
+                        nexttokens[itc] = (mtoken.span(0)[0], mtoken.span(0)[1], mtoken)
+                    else:
+                        nexttokens[itc] = (len(stex), len(stex), None)
+                start, tokend, mtoken = nexttokens[itc]
+                if start >= end:
+                    continue
+                if tokend > end:
+                    # overlaps the one before, so it is what's left of it
+                    mtoken = tokenchain[itc][1].search(stex, pos, end)
+                    if not mtoken:
+                        continue
+                    start = mtoken.span(0)[0]
+                found = (itc, start, mtoken)
+                end = start
+
+            if not found:
+                break
+            itc, start, mtoken = found
+            if start > pos:
+                self.toklist.append(("", "", stex[pos:start]))
+
+            tokpair = tokenchain[itc][3](mtoken, self)
+            self.toklist.append((tokpair[0], tokpair[1], mtoken.group(0)))
+            pos = start + len(mtoken.group(0))
+
+        if pos < len(stex):
+            self.toklist.append(("", "", stex[pos:]))
+
     # recurses over itc < len(tokenchain)
     def TokenizePhraseRecurse(self, qs, stex, itc):
         # end of the chain
@@ -303,7 +360,10 @@ class PhraseTokenize:
                     "Removing question number from para appears to have removed all text (this probably just means a footnote marker is using [], just change to ())."
                 )
 
-        self.TokenizePhraseRecurse(date, stex, 0)
+        if self.singlepass:
+            self.TokenizePhrase(stex)
+        else:
+            self.TokenizePhraseRecurse(date, stex, 0)
 
     def GetPara(self):
         res = []
@@ -1,17 +1,455 @@
+import glob
+import hashlib
+import inspect
 import json
 import os
+import pickle
 import re
+from collections import OrderedDict
+from functools import lru_cache
 
 members_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "members"))
+cache_dir = os.path.join(members_dir, ".cache")
+
+
+# Dates are compared as integers, 2024-01-09 being 20240109, which sort the
+# same as the ISO strings but are quicker to compare. A date of just a year
+# (or year and month), as some older entries have, covers all of it, so
+# starts on the first day and ends on the last. A missing date is open
+# ended. The same date always gives back the same int, so entries share
+# them rather than each having their own.
+@lru_cache(maxsize=None)
+def date_ordinal(date, end=False):
+    if not date:
+        return 99999999 if end else 0
+    return int((date.replace("-", "") + ("9999" if end else "0000"))[:8])
+
+
+# A list of entries with start_date and end_date, which can also find the
+# entries current on a date without checking every one. Bigger lists get a
+# centred interval tree, built when first needed, so a lookup costs
+# O(log n) plus the number of matches. Matches come back in list order.
+class DateIndex(list):
+    linear_size = 8
+
+    _spans = None
+    _tree = None
+
+    def __getstate__(self):
+        # the spans and tree are quicker to rebuild than to store
+        return {}
+
+    # (start, end) of each entry, as date ordinals
+    def spans(self):
+        if self._spans is None or len(self._spans) != len(self):
+            self._spans = [
+                (
+                    date_ordinal(m.get("start_date")),
+                    date_ordinal(m.get("end_date"), True),
+                )
+                for m in self
+            ]
+            self._tree = None
+        return self._spans
+
+    def on(self, date):
+        if not date:
+            return list(self)
+        day = date_ordinal(date)
+        spans = self.spans()
+        if len(self) <= self.linear_size:
+            return [m for m, (start, end) in zip(self, spans) if start <= day <= end]
+        if self._tree is None:
+            self._tree = self.build_tree(
+                [
+                    (start, end, i)
+                    for i, (start, end) in enumerate(spans)
+                    if start <= end
+                ]
+            )
+
+        found = []
+        node = self._tree
+        while node:
+            centre, by_start, by_end, left, right = node
+            if day < centre:
+                for start, end, i in by_start:
+                    if start > day:
+                        break
+                    found.append(i)
+                node = left
+            elif day > centre:
+                for start, end, i in by_end:
+                    if end < day:
+                        break
+                    found.append(i)
+                node = right
+            else:
+                found.extend(i for start, end, i in by_start)
+                break
+        found.sort()
+        return [self[i] for i in found]
+
+    @classmethod
+    def build_tree(cls, spans):
+        if not spans:
+            return None
+        points = sorted(set([span[0] for span in spans] + [span[1] for span in spans]))
+        centre = points[len(points) // 2]
+        here = [span for span in spans if span[0] <= centre <= span[1]]
+        return (
+            centre,
+            sorted(here),
+            sorted(here, key=lambda span: span[1], reverse=True),
+            cls.build_tree([span for span in spans if span[1] < centre]),
+            cls.build_tree([span for span in spans if span[0] > centre]),
+        )
+
+
+# A small record that can't be changed, for the entries the name and
+# identifier lookups are built from, of which there are one for every name
+# and membership of everyone. Fields are read as with the dicts used for
+# everything else, m["id"] or m.get("id"), as they are used alongside them.
+# Being shared between lookups, anything wanting to add to one should copy
+# it into a dict first.
+class Record(object):
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    __getitem__ = object.__getattribute__
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __contains__(self, name):
+        return name in self.__slots__
+
+    def __setattr__(self, name, value):
+        raise TypeError("%s records can't be changed" % type(self).__name__)
+
+    def __reduce__(self):
+        return (type(self), tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return "%s(%s)" % (
+            type(self).__name__,
+            ", ".join("%s=%r" % (name, getattr(self, name)) for name in self.__slots__),
+        )
+
+
+# the part of a membership something else, such as a name, was held
+# during, as (start date, end date), or None if they don't overlap
+def overlap(m, other):
+    start = max(m["start_date"], other.get("start_date"), key=date_ordinal)
+    end = min(
+        m["end_date"], other.get("end_date"), key=lambda date: date_ordinal(date, True)
+    )
+    if date_ordinal(start) > date_ordinal(end, True):
+        return None
+    return start, end
+
+
+# a name a membership was known by, and when
+class Alias(Record):
+    __slots__ = ("id", "person_id", "start_date", "end_date")
+
+
+# a person over one of their memberships, for identifiers such as PIMS IDs
+class PersonSpan(Record):
+    __slots__ = ("person", "start_date", "end_date")
+
+    # a copy of the person with the dates, for callers to fill in more
+    def details(self):
+        return dict(self.person, start_date=self.start_date, end_date=self.end_date)
+
+
+# how someone is named from one of their main names
+def format_name(nm):
+    if "family_name" in nm:
+        name = nm["family_name"]
+        if nm.get("given_name"):
+            name = nm["given_name"] + " " + name
+        if nm.get("honorific_prefix"):
+            name = nm["honorific_prefix"] + " " + name
+    else:  # Lord (e.g. Lord Morrow in NI)
+        name = nm["honorific_prefix"]
+        if nm["lordname"]:
+            name += " %s" % nm["lordname"]
+        if nm["lordofname"]:
+            name += " of %s" % nm["lordofname"]
+    return name
+
+
+# A resolver as it was on one day: the memberships current then, what
+# their people were called and who had which identifiers, each in a flat
+# dict. It's made once the date of the sitting being parsed is known, so
+# the many lookups of members in a day are each one dict lookup rather
+# than going through every date range again. Get one with resolver.day().
+class DayView(object):
+    def __init__(self, resolver, date):
+        self.resolver = resolver
+        self.date = date
+        self.members = {}  # member ID --> membership
+        self.person_members = {}  # person ID --> memberships
+        self.names = {}  # person ID --> name
+        self.pims = {}  # PIMS ID --> person
+        self.mnis = {}  # datadotparl ID --> person
+        for m in resolver.members_on(date):
+            if "person_id" not in m:
+                continue  # not from the members data, as some of NI's
+            person_id = m["person_id"]
+            self.members[m["id"]] = m
+            if person_id in self.person_members:
+                self.person_members[person_id].append(m)
+                continue
+            self.person_members[person_id] = [m]
+            for nm in resolver.main_names.get(person_id, DateIndex()).on(date):
+                self.names[person_id] = format_name(nm)
+                break
+            person = resolver.persons.get(person_id, {})
+            span = PersonSpan(person, m["start_date"], m["end_date"])
+            for identifier in person.get("identifiers", []):
+                if identifier.get("scheme") == "pims_id":
+                    self.pims.setdefault(identifier.get("identifier"), span)
+                elif identifier.get("scheme") == "datadotparl_id":
+                    self.mnis.setdefault(identifier.get("identifier"), span)
+
+    def memberships(self, person_id):
+        return self.person_members.get(person_id, [])
+
+    # the same as the resolver's name_on_date, for this day
+    def name(self, person_id):
+        try:
+            return self.names[person_id]
+        except KeyError:
+            # someone without a membership on the day, such as a former
+            # member mentioned in a committee
+            name = self.resolver.name_on_date(person_id, self.date)
+            self.names[person_id] = name
+            return name
+
+    # the same as the resolver's match_by_mnis and match_by_pims
+    def match_by_mnis(self, mnis_id):
+        m = self.mnis.get(mnis_id)
+        if m is None:
+            return self.resolver.match_by_mnis(mnis_id, self.date)
+        return m.details()
+
+    def match_by_pims(self, pims_id):
+        m = self.pims.get(pims_id)
+        if m is None:
+            return self.resolver.match_by_pims(pims_id, self.date)
+        return m.details()
+
+
+# A bounded least recently used cache for lookups that only depend on their
+# arguments and the loaded data, such as turning a speaker's name and the
+# date into possible ids. Anything depending on what has been said earlier
+# in the day must be worked out from the result, not stored in here. The
+# values are shared between callers, so store something that can't be
+# changed, or copy it on the way out.
+class LookupCache(object):
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.clear()
+
+    def __getstate__(self):
+        # starts empty when loaded from the resolver cache
+        return {"maxsize": self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state["maxsize"])
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fetch(self, key, fn, *args):
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            value = fn(*args)
+            self.entries[key] = value
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+# people.json parsed once, with the lookups the resolvers need built up
+# front. This is shared by everything in the process, so copy before changing.
+class PeopleData(object):
+    def __init__(self, filename):
+        with open(filename) as f:
+            self.data = json.load(f)
+
+        self.posts = {post["id"]: post for post in self.data["posts"]}
+        self.organizations = {org["id"]: org for org in self.data["organizations"]}
+        self.persons = {person["id"]: person for person in self.data["persons"]}
+        self.memberships = {}  # membership ID --> membership
+        self.person_memberships = {}  # person ID --> memberships
+        self.organization_posts = {}  # organization ID --> posts
+        self.organization_memberships = {}  # organization ID --> memberships
+        self.constituencies = {}  # constituency name --> posts
+        self.identifiers = {}  # scheme --> identifier --> person
+        self.names = {}  # full name --> persons
+
+        for post in self.data["posts"]:
+            self.organization_posts.setdefault(post["organization_id"], []).append(post)
+            for name in [post["area"]["name"]] + post["area"].get("other_names", []):
+                self.constituencies.setdefault(name, []).append(post)
+
+        for mship in self.data["memberships"]:
+            if "id" in mship:
+                self.memberships[mship["id"]] = mship
+            self.person_memberships.setdefault(mship["person_id"], []).append(mship)
+            # a membership can be of an organization directly, or via a post
+            orgs = set([mship.get("organization_id")])
+            if "post_id" in mship:
+                orgs.add(self.posts[mship["post_id"]]["organization_id"])
+            for org in orgs:
+                if org:
+                    self.organization_memberships.setdefault(org, []).append(mship)
+
+        for person in self.data["persons"]:
+            for identifier in person.get("identifiers", []):
+                self.identifiers.setdefault(identifier["scheme"], {})[
+                    identifier["identifier"]
+                ] = person
+            for name in person.get("other_names", []):
+                if "name" in name:
+                    full = name["name"]
+                elif "family_name" in name:
+                    full = "%s %s" % (name.get("given_name", ""), name["family_name"])
+                else:
+                    full = name.get("lordname") or name.get("lordofname") or ""
+                    if name.get("lordname") and name.get("lordofname"):
+                        full += " of " + name["lordofname"]
+                    full = "%s %s" % (name.get("honorific_prefix", ""), full)
+                full = full.strip()
+                persons = self.names.setdefault(full, [])
+                if full and (not persons or persons[-1] is not person):
+                    persons.append(person)
+
+
+def load_people_json(filename=None):
+    filename = filename or os.path.join(members_dir, "people.json")
+    return _load_people_json(os.path.abspath(filename))
+
+
+@lru_cache(maxsize=None)
+def _load_people_json(filename):
+    return PeopleData(filename)
+
+
+# The mysoc_validator version of the same data, for the newer code
+def get_popolo(filename=None):
+    filename = filename or os.path.join(members_dir, "people.json")
+    return _get_popolo(os.path.abspath(filename))
+
+
+@lru_cache(maxsize=None)
+def _get_popolo(filename):
+    from mysoc_validator import Popolo
+
+    return Popolo.model_validate(load_people_json(filename).data)
+
+
+# Stands in for a resolver until it is first used, only then loading the
+# members data, so modules can make their shared resolvers at import time
+# without paying for it if they're never used. Everything else goes to the
+# resolver itself.
+class LazyResolver(object):
+    def __init__(self, cls):
+        object.__setattr__(self, "_cls", cls)
+        object.__setattr__(self, "_resolver", None)
+
+    def load(self):
+        if self._resolver is None:
+            object.__setattr__(self, "_resolver", self._cls())
+        return self._resolver
+
+    def __getattr__(self, name):
+        # not special methods, which copying or pickling look for
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.load(), name, value)
 
 
 class ResolverBase(object):
+    # The built lookups are saved to cache_dir and reused until the members
+    # data or the resolver code changes, as building them takes a while
+    use_cache = True
+
+    day_view = None  # the last DayView asked for
+
     def __init__(self):
-        self.reloadJSON()
+        if not self.load_cache():
+            self.reloadJSON()
+            self.save_cache()
+
+    def cache_filename(self):
+        sources = sorted(glob.glob(os.path.join(members_dir, "*.json")))
+        sources += [inspect.getsourcefile(cls) for cls in type(self).__mro__[:-1]]
+        key = hashlib.sha1()
+        for source in sources:
+            st = os.stat(source)
+            key.update(("%s %d %d\n" % (source, st.st_mtime_ns, st.st_size)).encode())
+        return os.path.join(
+            cache_dir,
+            "%s.%s-%s.pickle"
+            % (type(self).__module__, type(self).__name__, key.hexdigest()),
+        )
+
+    def load_cache(self):
+        if not self.use_cache:
+            return False
+        try:
+            with open(self.cache_filename(), "rb") as f:
+                self.__dict__.update(pickle.load(f))
+        except Exception:
+            # missing or unreadable, so it'll get built again
+            return False
+        return True
+
+    def save_cache(self):
+        if not self.use_cache:
+            return
+        filename = self.cache_filename()
+        # opened as any other file is, so it gets the same permissions from
+        # the umask and others in the group can read it
+        tmp = "%s.%d.tmp" % (filename, os.getpid())
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(self.__dict__, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, filename)
+            # then clear out any earlier versions for this resolver
+            for old in glob.glob(filename.rpartition("-")[0] + "-*.pickle"):
+                if old != filename:
+                    os.remove(old)
+        except Exception:
+            # not being able to cache isn't fatal, it just means a rebuild
+            if os.path.exists(tmp):
+                os.remove(tmp)
 
     def reloadJSON(self):
         self.members = {}  # ID --> membership
         self.persons = {}  # ID --> person
+        self.main_names = {}  # person ID --> main names
         self.fullnames = {}  # "Firstname Lastname" --> memberships
         self.lastnames = {}  # Surname --> memberships
 
@@ -25,42 +463,42 @@ class ResolverBase(object):
         self.parties = {}  # party --> memberships
         self.membertopersonmap = {}  # member ID --> person ID
         self.persontomembermap = {}  # person ID --> memberships
+        self.members_index = None  # all memberships, by date
+        self.lookup_cache = LookupCache()  # deterministic name lookups
 
-    def import_constituencies(self):
-        data = json.load(open(os.path.join(members_dir, "people.json")))
-        for con in data["posts"]:
-            if con["organization_id"] != self.import_organization_id:
-                continue
+    def cache_stats(self):
+        return self.lookup_cache.stats()
 
+    def import_constituencies(self):
+        people = load_people_json()
+        for con in people.organization_posts.get(self.import_organization_id, []):
             attr = {
                 "id": con["id"],
                 "start_date": con.get("start_date", "0000-00-00"),
                 "end_date": con.get("end_date", "9999-12-31"),
             }
-            if len(attr["start_date"]) == 4:
-                attr["start_date"] = "%s-01-01" % attr["start_date"]
-            if len(attr["end_date"]) == 4:
-                attr["end_date"] = "%s-12-31" % attr["end_date"]
 
             names = [con["area"]["name"]] + con["area"].get("other_names", [])
             for name in names:
                 if con["id"] not in self.considtonamemap:
                     self.considtonamemap[con["id"]] = name
-                self.constoidmap.setdefault(name, []).append(attr)
+                self.constoidmap.setdefault(name, DateIndex()).append(attr)
                 nopunc = self.strip_punctuation(name)
-                self.constoidmap.setdefault(nopunc, []).append(attr)
+                self.constoidmap.setdefault(nopunc, DateIndex()).append(attr)
 
     def strip_punctuation(self, cons):
         nopunc = cons.replace(",", "").replace("-", "").replace(" ", "").lower().strip()
         return nopunc
 
     def import_people_json(self):
-        data = json.load(open(os.path.join(members_dir, "people.json")))
-        posts = {post["id"]: post for post in data["posts"]}
-        orgs = {org["id"]: org for org in data["organizations"]}
-        for mship in data["memberships"]:
-            self.import_people_membership(mship, posts, orgs)
-        for person in data["persons"]:
+        people = load_people_json()
+        mships = people.organization_memberships.get(self.import_organization_id, [])
+        for mship in mships:
+            # memberships get filled in as they're imported, so take a copy
+            self.import_people_membership(
+                dict(mship), people.posts, people.organizations
+            )
+        for person in people.data["persons"]:
             self.import_people_names(person)
 
     def import_people_membership(self, mship, posts, orgs):
@@ -87,22 +525,10 @@ class ResolverBase(object):
         consids = self.constoidmap[mship["constituency"]]
         consid = None
         # find the constituency id for this person
-        mship_start_date = (
-            len(mship["start_date"]) == 4
-            and ("%s-01-01" % mship["start_date"])
-            or mship["start_date"]
-        )
-        mship_end_date = (
-            len(mship["end_date"]) == 4
-            and ("%s-12-31" % mship["end_date"])
-            or mship["end_date"]
-        )
-        for cons in consids:
-            if (
-                cons["start_date"] <= mship_start_date
-                and mship_start_date <= mship_end_date
-                and mship_end_date <= cons["end_date"]
-            ):
+        start = date_ordinal(mship["start_date"])
+        end = date_ordinal(mship["end_date"], True)
+        for cons, (cons_start, cons_end) in zip(consids, consids.spans()):
+            if cons_start <= start <= end <= cons_end:
                 if consid and consid != cons["id"]:
                     raise Exception(
                         "Two constituency ids %s %s overlap with MP %s"
@@ -122,37 +548,37 @@ class ResolverBase(object):
         # check first date ranges don't overlap, MPs only
         # Only check modern MPs as we might have overlapping data previously
         if self.import_organization_id == "house-of-commons":
-            for cons in self.considtomembermap.get(consid, []):
-                if cons["end_date"] < "1997-05-01":
+            others = self.considtomembermap.get(consid, DateIndex())
+            for cons, (cons_start, cons_end) in zip(others, others.spans()):
+                if cons_end < date_ordinal("1997-05-01"):
                     continue
-                if (
-                    cons["start_date"] <= mship["start_date"] <= cons["end_date"]
-                    or cons["start_date"] <= mship["end_date"] <= cons["end_date"]
-                    or mship["start_date"] <= cons["start_date"] <= mship["end_date"]
-                    or mship["start_date"] <= cons["end_date"] <= mship["end_date"]
-                ):
+                if cons_start <= end and start <= cons_end:
                     raise Exception(
                         "%s %s Two MP entries for constituency %s with overlapping dates"
                         % (mship, cons, consid)
                     )
         # then add in
-        self.considtomembermap.setdefault(consid, []).append(mship)
+        self.considtomembermap.setdefault(consid, DateIndex()).append(mship)
 
         # ... and by party
         if "on_behalf_of_id" in mship:
             mship["party"] = orgs[mship["on_behalf_of_id"]]["name"]
-            self.parties.setdefault(mship["party"], []).append(mship)
+            self.parties.setdefault(mship["party"], DateIndex()).append(mship)
 
         if "hansard_id" in mship:
-            self.historichansard.setdefault(int(mship["hansard_id"]), []).append(mship)
+            self.historichansard.setdefault(
+                int(mship["hansard_id"]), DateIndex()
+            ).append(mship)
 
     def import_people_names(self, person):
         if person["id"] not in self.persontomembermap:
             return
+        person = dict(person)
         self.persons[person["id"]] = person
         memberships = [self.members[x] for x in self.persontomembermap[person["id"]]]
         for other_name in person.get("other_names", []):
             if other_name.get("note") == "Main":
+                self.main_names.setdefault(person["id"], DateIndex()).append(other_name)
                 self.import_people_main_name(other_name, memberships)
             elif other_name.get("note") == "Alternate":
                 self.import_people_alternate_name(person, other_name, memberships)
@@ -160,25 +586,17 @@ class ResolverBase(object):
             if identifier.get("scheme") == "pims_id":
                 id = identifier.get("identifier")
                 for m in memberships:
-                    p = person.copy()
-                    p["start_date"] = m["start_date"]
-                    p["end_date"] = m["end_date"]
-                    self.pims.setdefault(id, []).append(p)
+                    p = PersonSpan(person, m["start_date"], m["end_date"])
+                    self.pims.setdefault(id, DateIndex()).append(p)
             elif identifier.get("scheme") == "datadotparl_id":
                 id = identifier.get("identifier")
                 for m in memberships:
-                    p = person.copy()
-                    p["start_date"] = m["start_date"]
-                    p["end_date"] = m["end_date"]
-                    self.mnis.setdefault(id, []).append(p)
+                    p = PersonSpan(person, m["start_date"], m["end_date"])
+                    self.mnis.setdefault(id, DateIndex()).append(p)
 
     def import_people_main_name(self, name, memberships):
-        mships = [
-            m
-            for m in memberships
-            if m["start_date"] <= name.get("end_date", "9999-12-31")
-            and m["end_date"] >= name.get("start_date", "1000-01-01")
-        ]
+        mships = [(m, overlap(m, name)) for m in memberships]
+        mships = [(m, span) for m, span in mships if span]
         if not mships:
             return
 
@@ -199,79 +617,67 @@ class ResolverBase(object):
         if self.import_organization_id != "house-of-commons" and given_name:
             initial_name = given_name[0] + " " + family_name
 
-        for m in mships:
-            newattr = {"id": m["id"], "person_id": m["person_id"]}
+        for m, span in mships:
             # merge date ranges - take the smallest range covered by
             # the membership, and the alias's range (if it has one)
-            newattr["start_date"] = max(
-                m["start_date"], name.get("start_date", "1000-01-01")
-            )
-            newattr["end_date"] = min(m["end_date"], name.get("end_date", "9999-12-31"))
-            self.fullnames.setdefault(compoundname, []).append(newattr)
+            newattr = Alias(m["id"], m["person_id"], *span)
+            self.fullnames.setdefault(compoundname, DateIndex()).append(newattr)
             if no_initial:
-                self.fullnames.setdefault(no_initial, []).append(newattr)
+                self.fullnames.setdefault(no_initial, DateIndex()).append(newattr)
             if initial_name:
-                self.fullnames.setdefault(initial_name, []).append(newattr)
-            self.lastnames.setdefault(family_name, []).append(newattr)
+                self.fullnames.setdefault(initial_name, DateIndex()).append(newattr)
+            self.lastnames.setdefault(family_name, DateIndex()).append(newattr)
 
     def import_people_alternate_name(self, person, other_name, memberships):
         if other_name.get("organization_id") not in (None, self.import_organization_id):
             return
-        mships = [
-            m
-            for m in memberships
-            if m["start_date"] <= other_name.get("end_date", "9999-12-31")
-            and m["end_date"] >= other_name.get("start_date", "1000-01-01")
-        ]
-        for m in mships:
-            newattr = {"id": m["id"], "person_id": m["person_id"]}
+        for m in memberships:
             # merge date ranges - take the smallest range covered by
             # the membership, and the alias's range (if it has one)
-            newattr["start_date"] = max(
-                m["start_date"], other_name.get("start_date", "1000-01-01")
-            )
-            newattr["end_date"] = min(
-                m["end_date"], other_name.get("end_date", "9999-12-31")
-            )
+            span = overlap(m, other_name)
+            if not span:
+                continue
+            newattr = Alias(m["id"], m["person_id"], *span)
             if other_name.get("family_name"):
-                self.lastnames.setdefault(other_name["family_name"], []).append(newattr)
+                self.lastnames.setdefault(
+                    other_name["family_name"], DateIndex()
+                ).append(newattr)
             else:
-                self.fullnames.setdefault(other_name["name"], []).append(newattr)
+                self.fullnames.setdefault(other_name["name"], DateIndex()).append(
+                    newattr
+                )
 
     # Used by Commons and NI
     def name_on_date(self, person_id, date):
-        person = self.persons[person_id]
-        for nm in person["other_names"]:
-            if nm["note"] != "Main":
-                continue
-            if (
-                nm.get("start_date", "0000-00-00")
-                <= date
-                <= nm.get("end_date", "9999-12-31")
-            ):
-                if "family_name" in nm:
-                    name = nm["family_name"]
-                    if nm.get("given_name"):
-                        name = nm["given_name"] + " " + name
-                    if nm.get("honorific_prefix"):
-                        name = nm["honorific_prefix"] + " " + name
-                else:  # Lord (e.g. Lord Morrow in NI)
-                    name = nm["honorific_prefix"]
-                    if nm["lordname"]:
-                        name += " %s" % nm["lordname"]
-                    if nm["lordofname"]:
-                        name += " of %s" % nm["lordofname"]
-                return name
-        raise Exception("No found for %s on %s" % (person["id"], date))
+        for nm in self.main_names.get(person_id, DateIndex()).on(date):
+            return format_name(nm)
+        raise Exception("No found for %s on %s" % (person_id, date))
 
     def membertoperson(self, memberid):
         return self.membertopersonmap[memberid]
 
+    # the resolver as it was on a date. The last one is kept, as a parser
+    # asks for the same day over and over
+    def day(self, date):
+        if self.day_view is None or self.day_view.date != date:
+            self.day_view = DayView(self, date)
+        return self.day_view
+
+    # all the memberships, by date
+    def all_members(self):
+        if self.members_index is None or len(self.members_index) != len(self.members):
+            self.members_index = DateIndex(self.members.values())
+        return self.members_index
+
+    # all the memberships current on a date
+    def members_on(self, date):
+        return self.all_members().on(date)
+
     def _match_by_id(self, lookup, id, date):
-        matches = getattr(self, lookup).get(id, [])
-        for m in matches:
-            if m["start_date"] <= date <= m["end_date"]:
-                return m
+        matches = getattr(self, lookup).get(id)
+        if matches:
+            for m in matches.on(date):
+                return m.details()
         return None
 
     def match_by_mnis(self, mnis_id, date):
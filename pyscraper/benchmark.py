@@ -0,0 +1,820 @@
+#! /usr/bin/env python3
+
+# Timings for the slower parts of the parser, run against files recorded
+# from earlier runs, for example to time the gid redirect diffing on two
+# versions of a day:
+#
+#   ./benchmark.py diff debates2024-01-10a.xml debates2024-01-10b.xml
+#
+# or to time the whole pipeline on a set of recorded days, saving the results
+# to compare against those from another commit:
+#
+#   ./benchmark.py record fixtures debate CHAN_2024-01-10.xml
+#   ./benchmark.py record fixtures debate --previous CHAN_2024-01-10_1.xml \
+#       CHAN_2024-01-10_2.xml
+#   ./benchmark.py run fixtures --json before.json
+#   ./benchmark.py compare before.json after.json
+#
+# The tokenize command times the paragraph tokenizers on the paragraphs from
+# test_filtersentence_xml and those in any fixtures given, also checking they
+# give the same output on the fixtures, and the patch command checks that
+# applying patches in-process gives the same as running patch:
+#
+#   ./benchmark.py patch ni2020-03-03.json ni2020-03-03.json.patch
+#
+# The lords command times looking up the lords named on a recorded day,
+# usually one with long division lists, against going through every lord
+# with each name as GetLordID used to:
+#
+#   ./benchmark.py lords LHAN_2006-03-15.xml
+#
+# The startup command times importing the parser modules, and starting the
+# scripts, each in a new process, so that it includes anything done at
+# import time.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from base_resolver import DateIndex, LookupCache
+from contextexception import ContextException
+from lxml import etree
+from new_hansard import ParseDay
+from patchfilter import ApplyPatchFile
+from test_filtersentence_xml import PARAGRAPHS
+
+from filtersentence_xml import PhraseTokenize
+
+
+def read_file(filename):
+    with io.open(filename, encoding="utf-8") as f:
+        return f.read()
+
+
+# runs fn repeat times, returning the fastest time and the last result
+def timed(repeat, fn, *args):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        res = fn(*args)
+        taken = time.time() - start
+        if best is None or taken < best:
+            best = taken
+    return best, res
+
+
+def peak_memory():
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def count_matchtypes(redirects):
+    counts = {}
+    for line in redirects:
+        m = re.match('<gidredirect .*matchtype="([^"]*)"', line)
+        if m:
+            counts[m.group(1)] = counts.get(m.group(1), 0) + 1
+    return counts
+
+
+def bench_diff(args):
+    if len(args.files) % 2:
+        sys.exit("diff needs pairs of files, previous version then next")
+
+    parser = ParseDay()
+    total = 0
+    for prev, cur in zip(args.files[::2], args.files[1::2]):
+        xprevs, xcur = read_file(prev), read_file(cur)
+        taken, redirects = timed(args.repeat, parser.diff_versions, xprevs, xcur)
+        total += taken
+        print(
+            "{0} -> {1}: {2:.3f}s, {3}".format(
+                prev, cur, taken, count_matchtypes(redirects)
+            )
+        )
+
+    print("total: {0:.3f}s".format(total))
+    return True
+
+
+def random_date(rand):
+    return "%04d-%02d-%02d" % (
+        rand.randint(1990, 2024),
+        rand.randint(1, 12),
+        rand.randint(1, 28),
+    )
+
+
+def scan_dates(lookups):
+    return [
+        [m for m in entries if m["start_date"] <= date <= m["end_date"]]
+        for entries, date in lookups
+    ]
+
+
+def index_dates(lookups):
+    return [entries.on(date) for entries, date in lookups]
+
+
+def bench_dates(args):
+    from resolvemembernames import memberList
+
+    rand = random.Random(1)
+    names = []
+    for lookup in ("fullnames", "lastnames", "parties", "pims", "mnis"):
+        entries = list(getattr(memberList, lookup).values())
+        for i in range(args.count):
+            names.append((rand.choice(entries), random_date(rand)))
+    members = DateIndex(memberList.members.values())
+    house = [(members, random_date(rand)) for i in range(args.count // 100 or 1)]
+
+    ok = True
+    for title, lookups in (("name", names), ("whole house", house)):
+        # build the trees first, so that isn't counted
+        index_dates(lookups)
+        scan_time, scanned = timed(args.repeat, scan_dates, lookups)
+        index_time, found = timed(args.repeat, index_dates, lookups)
+        print(
+            "{0} lookups: scan {1:.0f}/s, indexed {2:.0f}/s".format(
+                title, len(lookups) / scan_time, len(lookups) / index_time
+            )
+        )
+        if scanned != found:
+            ok = False
+            print("  DIFFERENT results from scanning")
+    return ok
+
+
+# a day's speakers, named in full with their constituency the first time and
+# by title and surname after that, as in Hansard
+def speaker_days(memberList, count, rand):
+    days = []
+    for i in range(count):
+        date = random_date(rand)
+        members = memberList.mpslistondate(date)
+        if not members:
+            continue
+        speakers = rand.sample(members, min(30, len(members)))
+        seen = set()
+        day = []
+        for j in range(300):
+            m = rand.choice(speakers)
+            name = memberList.name_on_date(m["person_id"], date)
+            if m["id"] in seen:
+                day.append((name.split()[0] + " " + name.split()[-1], None, date))
+            else:
+                day.append((name, m["constituency"], date))
+                seen.add(m["id"])
+        days.append(day)
+    return days
+
+
+def match_speakers(memberList, days):
+    found = []
+    for day in days:
+        memberList.cleardebatehistory()
+        for input, bracket, date in day:
+            try:
+                found.append(memberList.matchdebatename(input, bracket, date, "debate"))
+            except Exception as e:
+                found.append(str(e))
+    return found
+
+
+def bench_speakers(args):
+    from resolvemembernames import memberList
+
+    days = speaker_days(memberList, args.count, random.Random(1))
+    speeches = sum(len(day) for day in days)
+
+    memberList.lookup_cache = LookupCache(0)
+    uncached_time, uncached = timed(args.repeat, match_speakers, memberList, days)
+    memberList.lookup_cache = LookupCache()
+    cached_time, cached = timed(1, match_speakers, memberList, days)
+    print(
+        "speakers: uncached {0:.0f}/s, cached {1:.0f}/s, {2}".format(
+            speeches / uncached_time, speeches / cached_time, memberList.cache_stats()
+        )
+    )
+    if cached != uncached:
+        print("  DIFFERENT results with the cache")
+        return False
+    return True
+
+
+# a day's Member tags, as new_hansard sees them: the MNIS IDs of members
+# on the day, each speaking several times
+def member_days(resolver, count, rand):
+    days = []
+    for i in range(count):
+        date = random_date(rand)
+        ids = [id for id, spans in resolver.mnis.items() if spans.on(date)]
+        if ids:
+            days.append((date, [rand.choice(ids) for j in range(1000)]))
+    return days
+
+
+def resolve_members(resolver, days):
+    found = []
+    for date, ids in days:
+        for id in ids:
+            member = resolver.match_by_mnis(id, date)
+            found.append((member["id"], resolver.name_on_date(member["id"], date)))
+    return found
+
+
+def resolve_members_by_day(resolver, days):
+    found = []
+    for date, ids in days:
+        resolver.day_view = None  # so making it is counted
+        day = resolver.day(date)
+        for id in ids:
+            member = day.match_by_mnis(id)
+            found.append((member["id"], day.name(member["id"])))
+    return found
+
+
+def bench_members(args):
+    from resolvemembernames import memberList
+
+    days = member_days(memberList, args.count, random.Random(1))
+    tags = sum(len(ids) for date, ids in days)
+    resolver_time, by_resolver = timed(args.repeat, resolve_members, memberList, days)
+    day_time, by_day = timed(args.repeat, resolve_members_by_day, memberList, days)
+    print(
+        "members: resolver {0:.0f}/s, day view {1:.0f}/s".format(
+            tags / resolver_time, tags / day_time
+        )
+    )
+    if by_day != by_resolver:
+        print("  DIFFERENT results from the day view")
+        return False
+    return True
+
+
+# the calls made to GetLordID parsing some Lords days, most of them for
+# the names in division lists
+def recorded_lord_lookups(resolver, filenames):
+    calls = []
+    get_lord_id = resolver.GetLordID
+
+    def record(*args):
+        calls.append(args)
+        return get_lord_id(*args)
+
+    resolver.GetLordID = record
+    try:
+        for filename in filenames:
+            parse_fixture(filename, "lords")
+    finally:
+        del resolver.GetLordID
+    return calls
+
+
+# GetLordID as it was, checking every lord with the name in turn. None
+# stands for any of the errors it raised.
+def scan_lord_id(
+    by_name, ltitle, llordname, llordofname, loffice, stampurl, sdate, bDivision
+):
+    if ltitle == "Lord Bishop":
+        ltitle = "Bishop"
+    if ltitle == "Lord Archbishop":
+        ltitle = "Archbishop"
+    llordofname = llordofname.replace(".", "").strip()
+    llordname = re.sub("&#(039|146|8217);", "'", llordname.replace(".", "")).strip()
+    if ltitle == "Bishop" and llordofname == "Southwell" and sdate >= "2005-07-01":
+        llordofname = "Southwell and Nottingham"
+    if ltitle == "Bishop" and llordname == "Southwell" and sdate >= "2005-07-01":
+        llordname = "Southwell and Nottingham"
+    lname = llordname or llordofname
+
+    res = []
+    for lm in by_name.get(lname, []):
+        current = lm["start_date"] <= sdate <= lm["end_date"]
+        if lm["title"] != ltitle:
+            continue
+        if llordname and llordofname:
+            if lm["lordname"] == llordname and lm["lordofname"] == llordofname:
+                if current:
+                    res.append(lm)
+            continue
+        if lm["lordname"] and lm["lordofname"]:
+            continue
+        lmlname = lm["lordname"] or lm["lordofname"]
+        if (llordname and lm["lordname"]) or (llordofname and lm["lordofname"]):
+            if lname == lmlname and current:
+                res.append(lm)
+            continue
+        if lname == lmlname:
+            if current:
+                if (lm["lordname"] and llordofname) or not bDivision:
+                    return None
+                res.append(lm)
+            elif ltitle not in ("Bishop", "Archbishop") and (ltitle, lname) not in (
+                ("Duke", "Norfolk"),
+                ("Duke", "Wellington"),
+                ("Earl", "Kinnoull"),
+                ("Earl", "Selborne"),
+                ("Earl", "Oxford and Asquith"),
+                ("Earl", "Courtown"),
+                ("Earl", "Effingham"),
+                ("Earl", "Minto"),
+            ):
+                return None
+    if len(res) != 1:
+        return None
+    return res[0]["person_id"]
+
+
+# the lords by name, as GetLordID used to have them
+def lords_by_name(resolver):
+    by_name = {}
+    for lords in resolver.lordnames.values():
+        for lm in lords:
+            lname = (lm["lordname"] or lm["lordofname"]).replace(".", "")
+            by_name.setdefault(lname, []).append(
+                dict(
+                    title=lm["title"],
+                    lordname=lm["lordname"] or "",
+                    lordofname=lm["lordofname"] or "",
+                    start_date=lm["start_date"],
+                    end_date=lm["end_date"],
+                    person_id=resolver.membertoperson(lm["id"]),
+                )
+            )
+    return by_name
+
+
+def scan_lords(by_name, calls):
+    return [scan_lord_id(by_name, *args) for args in calls]
+
+
+def index_lords(resolver, calls):
+    found = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for args in calls:
+            try:
+                found.append(resolver.GetLordID(*args))
+            except (ContextException, AssertionError):
+                found.append(None)
+    return found
+
+
+def bench_lords(args):
+    from resolvenames import lordsList
+
+    resolver = lordsList.load()
+    calls = recorded_lord_lookups(resolver, args.files)
+    if not calls:
+        print("no lords looked up in {0}".format(" ".join(args.files)))
+        return False
+    by_name = lords_by_name(resolver)
+    scan_time, scanned = timed(args.repeat, scan_lords, by_name, calls)
+    index_time, found = timed(args.repeat, index_lords, resolver, calls)
+    print(
+        "lords: {0} lookups, scan {1:.0f}/s, indexed {2:.0f}/s".format(
+            len(calls), len(calls) / scan_time, len(calls) / index_time
+        )
+    )
+    if scanned != found:
+        print("  DIFFERENT results from scanning")
+        return False
+    return True
+
+
+def tokenize_paragraphs(paragraphs, singlepass):
+    found = []
+    PhraseTokenize.singlepass = singlepass
+    for date, stex in paragraphs:
+        try:
+            tokens = PhraseTokenize(date, stex)
+            found.append((tokens.GetPara(), tokens.lastdate))
+        except Exception as e:
+            found.append(str(e))
+    return found
+
+
+# the paragraphs the parser tokenizes in each of the fixtures
+def fixture_paragraphs(directory):
+    import new_hansard
+
+    paragraphs = []
+
+    class RecordingPhraseTokenize(PhraseTokenize):
+        def __init__(self, date, stex):
+            paragraphs.append((date, stex))
+            super().__init__(date, stex)
+
+    new_hansard.PhraseTokenize = RecordingPhraseTokenize
+    try:
+        for fixture in load_fixtures(directory):
+            parse_fixture(os.path.join(directory, fixture["file"]), fixture["type"])
+    finally:
+        new_hansard.PhraseTokenize = PhraseTokenize
+    return paragraphs
+
+
+def bench_tokenize(args):
+    paragraphs = [("2010-01-01", stex) for stex in PARAGRAPHS]
+    if args.directory:
+        paragraphs += fixture_paragraphs(args.directory)
+
+    singlepass = PhraseTokenize.singlepass
+    try:
+        recurse_time, recursed = timed(
+            args.repeat, tokenize_paragraphs, paragraphs, False
+        )
+        single_time, single = timed(args.repeat, tokenize_paragraphs, paragraphs, True)
+    finally:
+        PhraseTokenize.singlepass = singlepass
+    print(
+        "tokenize: {0} paragraphs, recursive {1:.0f}/s, single pass {2:.0f}/s".format(
+            len(paragraphs),
+            len(paragraphs) / recurse_time,
+            len(paragraphs) / single_time,
+        )
+    )
+    ok = True
+    for (date, stex), before, after in zip(paragraphs, recursed, single):
+        if before != after:
+            ok = False
+            print("  DIFFERENT tokens for {0}: {1!r}".format(date, stex))
+    return ok
+
+
+def run_patch(pairs, directory):
+    patched = []
+    for i, (filename, patchfile) in enumerate(pairs):
+        copy = os.path.join(directory, str(i))
+        shutil.copyfile(filename, copy)
+        with open(patchfile, "rb") as f:
+            subprocess.run(["patch", "--quiet", copy], stdin=f, check=True)
+        with open(copy, "rb") as f:
+            patched.append(f.read())
+    return patched
+
+
+def apply_patches(pairs):
+    return [ApplyPatchFile(filename, patchfile) for filename, patchfile in pairs]
+
+
+def bench_patch(args):
+    if len(args.files) % 2:
+        sys.exit("patch needs pairs of files, the file then its patch")
+    pairs = list(zip(args.files[::2], args.files[1::2]))
+
+    directory = tempfile.mkdtemp()
+    try:
+        command_time, command = timed(args.repeat, run_patch, pairs, directory)
+    finally:
+        shutil.rmtree(directory)
+    inprocess_time, inprocess = timed(args.repeat, apply_patches, pairs)
+    print(
+        "patch: {0} files, patch command {1:.4f}s, in-process {2:.4f}s".format(
+            len(pairs), command_time, inprocess_time
+        )
+    )
+    ok = True
+    for (filename, patchfile), before, after in zip(pairs, command, inprocess):
+        if before != after:
+            ok = False
+            print("  DIFFERENT result patching {0}".format(filename))
+    return ok
+
+
+startup_modules = [
+    "miscfuncs",
+    "resolvemembernames",
+    "lords.resolvenames",
+    "new_hansard",
+    "runfilters",
+]
+
+startup_scripts = [
+    ["process_hansard.py", "--help"],
+    ["lazyrunall.py", "--help"],
+    # and what using the resolvers adds
+    ["-c", "import new_hansard; new_hansard.load_resolvers()"],
+]
+
+
+def run_python(args):
+    subprocess.run([sys.executable] + args, check=True, stdout=subprocess.DEVNULL)
+
+
+def bench_startup(args):
+    print("startup, best of {0}:".format(args.repeat))
+    for module in startup_modules:
+        taken, _ = timed(args.repeat, run_python, ["-c", "import " + module])
+        print("  import {0}: {1:.3f}s".format(module, taken))
+    for script in startup_scripts:
+        taken, _ = timed(args.repeat, run_python, script)
+        print("  {0}: {1:.3f}s".format(" ".join(script), taken))
+    return True
+
+
+# The fixtures are source XML files copied into a directory, listed with
+# their types in fixtures.json. A file recorded with a previous version of
+# the same day is also used to time the rewrite of that version.
+def load_fixtures(directory):
+    with open(os.path.join(directory, "fixtures.json")) as f:
+        return json.load(f)
+
+
+def bench_record(args):
+    try:
+        fixtures = load_fixtures(args.directory)
+    except IOError:
+        fixtures = []
+    if args.previous and len(args.files) != 1:
+        sys.exit("--previous needs exactly one file")
+
+    def copy(filename):
+        name = os.path.join(args.type, os.path.basename(filename))
+        os.makedirs(os.path.join(args.directory, args.type), exist_ok=True)
+        shutil.copyfile(filename, os.path.join(args.directory, name))
+        return name
+
+    for filename in args.files:
+        fixture = {"type": args.type, "file": copy(filename)}
+        if args.previous:
+            fixture["previous"] = copy(args.previous)
+        fixtures = [f for f in fixtures if f["file"] != fixture["file"]]
+        fixtures.append(fixture)
+
+    with open(os.path.join(args.directory, "fixtures.json"), "w") as f:
+        json.dump(fixtures, f, indent=2)
+    return True
+
+
+# parses one source file, returning the time spent loading the XML, walking
+# it and writing the output, along with the output and number of paragraphs
+def parse_fixture(filename, debate_type):
+    parser = ParseDay()
+    parser.set_parser_for_type(debate_type)
+    parser.parser.verbose = 0
+    with io.open(filename, encoding="utf-8") as xml_file:
+        start = time.time()
+        parser.parser.setup_parser(xml_file)
+        loaded = time.time()
+        if not parser.parse_day(xml_file, debate_type):
+            raise Exception("Failed to parse {0}".format(filename))
+        walked = time.time()
+        out = io.StringIO()
+        parser.output(out)
+        done = time.time()
+    paragraphs = len(parser.parser.root.findall(".//p"))
+    return (loaded - start, walked - loaded, done - walked), out.getvalue(), paragraphs
+
+
+def run_parse(args, fixtures):
+    files = []
+    stages = [0.0, 0.0, 0.0]
+    paragraphs = 0
+    for fixture in fixtures:
+        filename = os.path.join(args.directory, fixture["file"])
+        best = None
+        for i in range(args.repeat):
+            times, out, count = parse_fixture(filename, fixture["type"])
+            if best is None or sum(times) < sum(best):
+                best = times
+        stages = [total + taken for total, taken in zip(stages, best)]
+        paragraphs += count
+        files.append(
+            {
+                "file": fixture["file"],
+                "type": fixture["type"],
+                "seconds": sum(best),
+                "paragraphs": count,
+            }
+        )
+    seconds = sum(stages)
+    return {
+        "seconds": seconds,
+        "load_seconds": stages[0],
+        "walk_seconds": stages[1],
+        "output_seconds": stages[2],
+        "days": len(files),
+        "paragraphs": paragraphs,
+        "days_per_minute": len(files) * 60 / seconds if seconds else None,
+        "paragraphs_per_second": paragraphs / seconds if seconds else None,
+        "files": files,
+    }
+
+
+def run_rewrite(args, fixtures):
+    files = []
+    parser = ParseDay()
+    for fixture in fixtures:
+        if "previous" not in fixture:
+            continue
+        prev = parse_fixture(
+            os.path.join(args.directory, fixture["previous"]), fixture["type"]
+        )[1]
+        cur = parse_fixture(
+            os.path.join(args.directory, fixture["file"]), fixture["type"]
+        )[1]
+        taken, redirects = timed(args.repeat, parser.diff_versions, prev, cur)
+        files.append(
+            {
+                "file": fixture["file"],
+                "previous": fixture["previous"],
+                "seconds": taken,
+                "redirects": count_matchtypes(redirects),
+            }
+        )
+    return {"seconds": sum(f["seconds"] for f in files), "files": files}
+
+
+def run_resolve(args):
+    from resolvemembernames import memberList
+
+    days = speaker_days(memberList, args.days, random.Random(1))
+    lookups = sum(len(day) for day in days)
+    memberList.lookup_cache.clear()
+    taken, found = timed(1, match_speakers, memberList, days)
+    return {
+        "seconds": taken,
+        "lookups": lookups,
+        "lookups_per_second": lookups / taken if taken else None,
+        "cache": memberList.cache_stats(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_run(args):
+    fixtures = load_fixtures(args.directory)
+    if args.type:
+        fixtures = [f for f in fixtures if f["type"] in args.type]
+
+    start = time.time()
+    result = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "lxml": etree.__version__,
+        "repeat": args.repeat,
+        "stages": {},
+    }
+    for name, run in (
+        ("parse", lambda: run_parse(args, fixtures)),
+        ("rewrite", lambda: run_rewrite(args, fixtures)),
+        ("resolve", lambda: run_resolve(args)),
+    ):
+        stage = run()
+        # the peak so far, as the process's can only go up
+        stage["peak_memory_kb"] = peak_memory()
+        result["stages"][name] = stage
+        print("{0}: {1}".format(name, summary(stage)))
+    result["seconds"] = time.time() - start
+    result["peak_memory_kb"] = peak_memory()
+    print(
+        "total {0:.3f}s, peak memory {1:.0f}MB".format(
+            result["seconds"], result["peak_memory_kb"] / 1024
+        )
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+    return True
+
+
+def summary(stage):
+    return ", ".join(
+        "{0} {1}".format(key, "%.3f" % value if isinstance(value, float) else value)
+        for key, value in sorted(stage.items())
+        if not isinstance(value, (list, dict))
+    )
+
+
+def bench_compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print("{0} -> {1}".format(before.get("commit"), after.get("commit")))
+    for name in sorted(set(before["stages"]) & set(after["stages"])):
+        old, new = before["stages"][name], after["stages"][name]
+        for key in sorted(set(old) & set(new)):
+            if not isinstance(old[key], (int, float)) or isinstance(old[key], bool):
+                continue
+            change = ""
+            if old[key]:
+                change = " ({0:+.1f}%)".format((new[key] - old[key]) * 100 / old[key])
+            print(
+                "{0} {1}: {2:.3f} -> {3:.3f}{4}".format(
+                    name, key, old[key], new[key], change
+                )
+            )
+    return True
+
+
+parser = argparse.ArgumentParser(description="Time parts of the Hansard parser.")
+parser.add_argument("--repeat", type=int, default=3, help="runs of each to time")
+subparsers = parser.add_subparsers(dest="command", required=True)
+
+diff_parser = subparsers.add_parser(
+    "diff", help="time gid redirect diffing on pairs of versions"
+)
+diff_parser.add_argument("files", nargs="+", metavar="FILE")
+diff_parser.set_defaults(func=bench_diff)
+
+dates_parser = subparsers.add_parser(
+    "dates", help="compare date lookups in the resolvers with scanning every entry"
+)
+dates_parser.add_argument("--count", type=int, default=20000, help="lookups per index")
+dates_parser.set_defaults(func=bench_dates)
+
+speakers_parser = subparsers.add_parser(
+    "speakers", help="compare debate speaker matching with and without its cache"
+)
+speakers_parser.add_argument("--count", type=int, default=50, help="days to match")
+speakers_parser.set_defaults(func=bench_speakers)
+
+members_parser = subparsers.add_parser(
+    "members", help="compare resolving a day's Member tags with and without a day view"
+)
+members_parser.add_argument("--count", type=int, default=50, help="days to resolve")
+members_parser.set_defaults(func=bench_members)
+
+lords_parser = subparsers.add_parser(
+    "lords", help="compare looking up lords with an index and scanning every one"
+)
+lords_parser.add_argument("files", nargs="+", metavar="FILE", help="Lords XML")
+lords_parser.set_defaults(func=bench_lords)
+
+tokenize_parser = subparsers.add_parser(
+    "tokenize", help="compare the paragraph tokenizers on a corpus of paragraphs"
+)
+tokenize_parser.add_argument(
+    "directory", nargs="?", help="fixtures to add the paragraphs from"
+)
+tokenize_parser.set_defaults(func=bench_tokenize)
+
+patch_parser = subparsers.add_parser(
+    "patch", help="compare applying patches in-process with running patch"
+)
+patch_parser.add_argument("files", nargs="+", metavar="FILE")
+patch_parser.set_defaults(func=bench_patch)
+
+startup_parser = subparsers.add_parser(
+    "startup", help="time importing the parser modules and starting the scripts"
+)
+startup_parser.set_defaults(func=bench_startup)
+
+record_parser = subparsers.add_parser(
+    "record", help="copy source XML files into a set of fixtures"
+)
+record_parser.add_argument("directory")
+record_parser.add_argument("type", choices=ParseDay.valid_types)
+record_parser.add_argument("files", nargs="+", metavar="FILE")
+record_parser.add_argument(
+    "--previous", metavar="FILE", help="an earlier version of the same day"
+)
+record_parser.set_defaults(func=bench_record)
+
+run_parser = subparsers.add_parser(
+    "run", help="time parsing, rewriting and resolving on a set of fixtures"
+)
+run_parser.add_argument("directory")
+run_parser.add_argument(
+    "--type", action="append", choices=ParseDay.valid_types, help="only these types"
+)
+run_parser.add_argument("--days", type=int, default=50, help="days of speakers")
+run_parser.add_argument("--json", metavar="FILE", help="save the results here")
+run_parser.set_defaults(func=bench_run)
+
+compare_parser = subparsers.add_parser(
+    "compare", help="compare results saved by run from two commits"
+)
+compare_parser.add_argument("before")
+compare_parser.add_argument("after")
+compare_parser.set_defaults(func=bench_compare)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if not args.func(args):
+        sys.exit(1)
@@ -1,3 +1,4 @@
+import bisect
 import difflib
 import re
 
@@ -11,7 +12,6 @@ class PrevParsedFile:
 
 toppath = miscfuncs.toppath
 pwxmldirs = miscfuncs.pwxmldirs
-tempfilename = miscfuncs.tempfilename
 
 
 # get the min index that matches this
@@ -133,6 +133,7 @@ def DoFactorDiff(essflatbindx, essflatblist, essxindx, essxlist, chks, flatb):
         ((smb[0], smb[0] + smb[2]), (smb[1], smb[1] + smb[2]))
         for smb in sm.get_matching_blocks()[:-1]
     ]
+    smblockends = [lsmb[0][1] for lsmb in smblocks]
 
     # we collect the range for the previous speeches and map it to a set of ranges
     # in the next speeches
@@ -147,7 +148,11 @@ def DoFactorDiff(essflatbindx, essflatblist, essxindx, essxlist, chks, flatb):
         nixrlsz = 0
 
         # intersect the set of ranges against the contiguous blocks and match forwards
-        for lsmb in smblocks:
+        # (the blocks are in order, so start from the first that ends after ours starts)
+        for ib in range(bisect.bisect_right(smblockends, ixr[0]), len(smblocks)):
+            lsmb = smblocks[ib]
+            if lsmb[0][0] >= ixr[1]:
+                break
             if ixr[1] > lsmb[0][0] and ixr[0] < lsmb[0][1]:
                 ixi = (max(ixr[0], lsmb[0][0]), min(ixr[1], lsmb[0][1]))
                 assert ixi[0] < ixi[1]
@@ -0,0 +1,91 @@
+import io
+import re
+import zipfile
+
+# The zips from the Hansard feed can be kept as they were downloaded, as
+# cmpages/hansardzips/<id>_<updated>.zip, and read from there rather than
+# being unpacked. Files in them, including those in zips inside them, are
+# known by the path they would have if unpacked, so e.g. CHAN_2024-01-09.xml
+# in CHAN_2024-01-09.zip in 1234_2024-01-10_12:00:00.zip is
+# cmpages/hansardzips/1234_2024-01-10_12:00:00/CHAN_2024-01-09/CHAN_2024-01-09.xml
+# and any other path is opened from the filesystem as usual.
+
+# path --> (zip filename, names of the members down to the file)
+index = {}
+
+# the last zip opened from inside another, as files are read in turn from
+# each. It's kept in memory rather than as an open file, so is still fine
+# to use after forking.
+nested_cache = {}
+
+
+# the path a zip would be unpacked to
+def zip_path(zip_filename):
+    return re.sub(r"\.zip$", "", zip_filename, flags=re.I)
+
+
+def join(path, name):
+    return "{0}/{1}".format(path, name)
+
+
+# some of the zips use backslash as a directory separator
+def member_path(name):
+    return name.replace("\\", "/")
+
+
+def read_nested_zip(archive, name):
+    with archive.open(name) as f:
+        return zipfile.ZipFile(io.BytesIO(f.read()))
+
+
+def list_zip(archive, path, members=()):
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        name = member_path(info.filename)
+        if re.search(r"\.zip$", name, re.I):
+            try:
+                nested = read_nested_zip(archive, info.filename)
+            except zipfile.BadZipFile:
+                print("Unpacking failed for {0}".format(join(path, zip_path(name))))
+                continue
+            yield from list_zip(
+                nested, join(path, zip_path(name)), members + (info.filename,)
+            )
+        else:
+            yield join(path, name), members + (info.filename,)
+
+
+# adds the files in a zip to the index, returning their paths
+def add_zip(zip_filename):
+    with zipfile.ZipFile(zip_filename) as archive:
+        files = list(list_zip(archive, zip_path(zip_filename)))
+    for path, members in files:
+        index[path] = (zip_filename, members)
+    return [path for path, _ in files]
+
+
+def open_archive(zip_filename, members):
+    if not members:
+        return zipfile.ZipFile(zip_filename)
+    key = (zip_filename, members)
+    if key not in nested_cache:
+        nested_cache.clear()
+        parent = open_archive(zip_filename, members[:-1])
+        nested_cache[key] = read_nested_zip(parent, members[-1])
+    return nested_cache[key]
+
+
+# opens a file, from a zip if it's in one that has been added
+def open_source(filename, binary=False):
+    if filename not in index:
+        if binary:
+            return open(filename, "rb")
+        return io.open(filename, encoding="utf-8")
+
+    zip_filename, members = index[filename]
+    source = open_archive(zip_filename, members[:-1]).open(members[-1])
+    source.name = filename
+    if binary:
+        return source
+    return io.TextIOWrapper(source, encoding="utf-8")
@@ -12,8 +12,9 @@ os.chdir(os.path.dirname(sys.argv[0]) or ".")
 from optparse import OptionParser
 
 import ni.scrape
-from miscfuncs import SetQuiet
+from miscfuncs import SetQuiet, toppath
 from runfilters import RunFiltersDir, RunNIFilters
+from timings import SlowestProfiles
 
 # Parse the command line parameters
 
@@ -85,6 +86,21 @@ parser.add_option(
     default=None,
     help="launch ./patchtool to fix errors in source HTML",
 )
+parser.add_option(
+    "-j",
+    "--jobs",
+    type="int",
+    dest="jobs",
+    default=1,
+    help="number of processes to parse with, each handling whole days",
+)
+parser.add_option(
+    "--profile",
+    action="store_true",
+    dest="profile",
+    default=False,
+    help="profile parsing, keeping the output for the slowest files in parldata/profiles/lazyrunall",
+)
 parser.add_option(
     "--quietc",
     action="store_true",
@@ -99,6 +115,9 @@ if options.date:
     options.dateto = options.date
 if options.quietc:
     SetQuiet()
+options.profiles = None
+if options.profile:
+    options.profiles = SlowestProfiles(os.path.join(toppath, "profiles", "lazyrunall"))
 
 # See what commands there are
 
@@ -1,6 +1,13 @@
 import re
 
-from base_resolver import ResolverBase
+from base_resolver import (
+    DateIndex,
+    LazyResolver,
+    Record,
+    ResolverBase,
+    date_ordinal,
+    overlap,
+)
 from contextexception import ContextException
 
 titleconv = {
@@ -41,13 +48,18 @@ honcompl = re.compile(
 rehonorifics = re.compile("(?: [CKO]BE| DL| TD| QC| KCMG| KCB)+$")
 
 
+# a title and name a lord's membership was known by, and when
+class LordName(Record):
+    __slots__ = ("id", "title", "lordname", "lordofname", "start_date", "end_date")
+
+
 class LordsList(ResolverBase):
     import_organization_id = "house-of-lords"
 
     def reloadJSON(self):
         super(LordsList, self).reloadJSON()
 
-        self.lordnames = {}  # "lordnames" --> lords
+        self.lordnames = {}  # (title, lordname, lordofname) --> lords
         self.aliases = {}  # Corrections to full names
 
         self.import_people_json()
@@ -72,30 +84,26 @@ class LordsList(ResolverBase):
             mship["end_date"] = "9999-12-31"
 
     def import_people_main_name(self, name, memberships):
-        mships = [
-            m
-            for m in memberships
-            if m["start_date"] <= name.get("end_date", "9999-12-31")
-            and m["end_date"] >= name.get("start_date", "1000-01-01")
-        ]
+        mships = [(m, overlap(m, name)) for m in memberships]
+        mships = [(m, span) for m, span in mships if span]
         if not mships:
             return
-        lname = name["lordname"] or name["lordofname"]
-        lname = re.sub("\.", "", lname)
-        assert lname
-        attr = {
-            "title": name["honorific_prefix"],
-            "lordname": name.get("lordname", ""),
-            "lordofname": name.get("lordofname", ""),
-        }
-        for m in mships:
-            newattr = attr.copy()
-            newattr["start_date"] = max(
-                m["start_date"], name.get("start_date", "1000-01-01")
+        assert name["lordname"] or name["lordofname"]
+        # a lord with only one of the names has "" for the other
+        key = (
+            name["honorific_prefix"],
+            name.get("lordname") or "",
+            name.get("lordofname") or "",
+        )
+        for m, span in mships:
+            newattr = LordName(
+                m["id"],
+                name["honorific_prefix"],
+                name.get("lordname", ""),
+                name.get("lordofname", ""),
+                *span,
             )
-            newattr["end_date"] = min(m["end_date"], name.get("end_date", "9999-12-31"))
-            newattr["id"] = m["id"]
-            self.lordnames.setdefault(lname, []).append(newattr)
+            self.lordnames.setdefault(key, DateIndex()).append(newattr)
 
     def import_people_alternate_name(self, person, other_name, memberships):
         if "name" not in other_name:
@@ -126,35 +134,18 @@ class LordsList(ResolverBase):
 
         lname = llordname or llordofname
         assert lname
-        lmatches = self.lordnames.get(lname, [])
-
-        # match to successive levels of precision for identification
-        res = []
-        for lm in lmatches:
-            if lm["title"] != ltitle:  # mismatch title
-                continue
-            if llordname and llordofname:  # two name case
-                if (lm["lordname"] == llordname) and (lm["lordofname"] == llordofname):
-                    if lm["start_date"] <= sdate <= lm["end_date"]:
-                        res.append(lm)
-                continue
-
-            # skip onwards if we have a double name
-            if lm["lordname"] and lm["lordofname"]:
-                continue
-
-            # single name cases (name and of-name)
-            # this is the case where they correspond (both names, or both of-names) correctly
-            lmlname = lm["lordname"] or lm["lordofname"]
-            if (llordname and lm["lordname"]) or (llordofname and lm["lordofname"]):
-                if lname == lmlname:
-                    if lm["start_date"] <= sdate <= lm["end_date"]:
-                        res.append(lm)
-                continue
-
-            # cross-match
-            if lname == lmlname:
-                if lm["start_date"] <= sdate <= lm["end_date"]:
+        # the lords with this title and exactly these names, which is who
+        # it is, unless a single name could be either kind
+        lmatches = self.lordnames.get((ltitle, llordname, llordofname), DateIndex())
+        res = lmatches.on(sdate)
+
+        # cross-match, a single name given as a lordname matching a lord
+        # with only a lordofname, or the other way round
+        if not (llordname and llordofname):
+            crossed = self.lordnames.get((ltitle, llordofname, llordname), DateIndex())
+            day = date_ordinal(sdate)
+            for lm, (start, end) in zip(crossed, crossed.spans()):
+                if start <= day <= end:
                     if lm["lordname"] and llordofname:
                         # if not IsNotQuiet():
                         print(
@@ -278,4 +269,4 @@ class LordsList(ResolverBase):
 
 
 # Construct the global singleton of class which people will actually use
-lordsList = LordsList()
+lordsList = LazyResolver(LordsList)
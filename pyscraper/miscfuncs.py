@@ -23,11 +23,21 @@ if not os.path.isdir(toppath):
     raise Exception("Data directory %s does not exist, please create" % (toppath))
 # print "Data directory (set in miscfuncs.py): %s" % toppath
 
-# temporary files are stored here
-tmppath = os.path.join(toppath, "tmp")
-if not os.path.isdir(tmppath):
-    os.mkdir(tmppath)
-tempfilename = tempfile.mktemp("", "pw-gluetemp-", tmppath)
+
+# temporary files are stored here. The directory is made the first time it
+# is asked for, rather than whenever this module is imported
+def __getattr__(name):
+    if name == "tmppath":
+        path = os.path.join(toppath, "tmp")
+        if not os.path.isdir(path):
+            os.mkdir(path)
+    elif name == "tempfilename":
+        path = tempfile.mktemp("", "pw-gluetemp-", __getattr__("tmppath"))
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    globals()[name] = path
+    return path
+
 
 # find raw data path
 rawdatapath = os.path.join(os.getcwd(), "../rawdata")
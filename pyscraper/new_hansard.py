@@ -2,15 +2,21 @@
 # -*- coding: utf-8 -*-
 
 import codecs
+import copy
 import datetime
+import glob
+import hashlib
 import io
 import os
 import re
+import sqlite3
 import sys
 import tempfile
 import xml.sax
+from itertools import islice
 
 import miscfuncs
+import timings
 from lxml import etree
 
 xmlvalidate = xml.sax.make_parser()
@@ -18,12 +24,20 @@ xmlvalidate = xml.sax.make_parser()
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(os.path.join(os.path.dirname(__file__), "lords"))
 
+from base_resolver import LazyResolver
 from contextexception import ContextException
 from gidmatching import DoFactorDiff, PrepareXMLForDiff
+from hansardzips import open_source
 from miscfuncs import pwxmldirs
-from pullgluepages import GetFileDayVersions, MakeDayMap
-from resolvemembernames import MemberList
-from resolvenames import LordsList
+from pullgluepages import (
+    FolderMtime,
+    GetFileDayVersions,
+    MakeDayMap,
+    NoteDayFile,
+    ScanDayDir,
+)
+from resolvemembernames import MemberList, memberList
+from resolvenames import lordsList
 from xmlfilewrite import WriteXMLHeader
 
 from filtersentence_xml import PhraseTokenize
@@ -48,9 +62,9 @@ class PimsList(MemberList):
         if len(ids) == 1:
             mem_id = ids.pop()
             person_id = self.membertopersonmap[mem_id]
-            member = self.persons[person_id]
+            member = dict(self.persons[person_id])
             member["person_id"] = member.get("id")
-            member["name"] = self.name_on_date(member["person_id"], date)
+            member["name"] = self.day(date).name(member["person_id"])
             return member
 
         return None
@@ -58,7 +72,7 @@ class PimsList(MemberList):
 
 class BaseParseDayXML(object):
     input_root = None
-    resolver = PimsList()
+    resolver = LazyResolver(PimsList)
 
     type_to_xpath = {
         "debate": (
@@ -155,6 +169,13 @@ class BaseParseDayXML(object):
     ns = ""
     ns_map = {}
 
+    # compiled XPath expressions and tag names without the namespace, shared
+    # between parsers as they only depend on the namespace
+    xpath_cache = {}
+    tag_name_cache = {}
+    # tag name -> name of the method which handles it, for each class
+    tag_methods_cache = {}
+
     division_number_element = "Number"
     division_ayes_attribute = "ayes"
     division_noes_attribute = "noes"
@@ -173,6 +194,13 @@ class BaseParseDayXML(object):
     output_heading = False
     skip_tag = None
     uc_titles = False
+    # an already parsed copy of the file, see ParseDay.load_source
+    source = None
+    # read the file a Fragment at a time, writing the output to
+    # output_stream as it is finished, see parse_day_streaming
+    streaming = False
+    output_stream = None
+    output_started = False
 
     def __init__(self):
         self.reset()
@@ -202,10 +230,22 @@ class BaseParseDayXML(object):
 
     def get_tag_name_no_ns(self, tag):
         # remove annoying namespace for brevities sake
-        tag_name = str(tag.tag)
-        tag_name = tag_name.replace("{{{0}}}".format(self.ns), "")
+        key = (self.ns, tag.tag)
+        tag_name = self.tag_name_cache.get(key)
+        if tag_name is None:
+            tag_name = str(tag.tag)
+            tag_name = tag_name.replace("{{{0}}}".format(self.ns), "")
+            self.tag_name_cache[key] = tag_name
         return tag_name
 
+    def xpath(self, el, path):
+        key = (self.ns, path)
+        find = self.xpath_cache.get(key)
+        if find is None:
+            find = etree.XPath(path, namespaces=self.ns_map)
+            self.xpath_cache[key] = find
+        return find(el)
+
     def get_pid(self):
         pid = "{0}{1}.{2}/{3}".format(
             self.rev,
@@ -245,21 +285,21 @@ class BaseParseDayXML(object):
         return speech_id
 
     def check_for_pi(self, tag):
-        pi = tag.xpath('.//processing-instruction("notus-xml")')
+        pi = self.xpath(tag, './/processing-instruction("notus-xml")')
         if len(pi) == 1 and self.pi_at_start:
             return
         if len(pi):
             self.parse_pi(pi[-1])
 
     def check_for_pi_at_start(self, tag):
+        # only the first node that isn't whitespace matters, which is either
+        # the text or the first child, so there's no need to list them all
         self.pi_at_start = False
-        for c in tag.xpath("./node()"):
-            if isinstance(c, str) and re.match("\s*$", c):
-                continue
-            elif type(c) is etree._ProcessingInstruction:
-                self.parse_pi(c)
-                self.pi_at_start = True
+        if tag.text and not re.match("\s*$", tag.text):
             return
+        if len(tag) and type(tag[0]) is etree._ProcessingInstruction:
+            self.parse_pi(tag[0])
+            self.pi_at_start = True
 
     # this just makes any gid redirection easier
     def get_text_from_element(self, el):
@@ -268,7 +308,7 @@ class BaseParseDayXML(object):
         return text
 
     def get_single_line_text_from_element(self, el):
-        text = "".join(el.xpath(".//text()"))
+        text = "".join(self.xpath(el, ".//text()"))
         text = re.sub("\n", " ", text).strip()
         return text
 
@@ -298,7 +338,7 @@ class BaseParseDayXML(object):
         self.current_speech_part = 1
 
     def parse_system_header(self, header):
-        sitting = header.xpath("./ns:Sitting", namespaces=self.ns_map)[0]
+        sitting = self.xpath(header, "./ns:Sitting")[0]
         date = (
             datetime.datetime.strptime(sitting.get("short-date"), "%d %B %Y")
             .date()
@@ -314,7 +354,7 @@ class BaseParseDayXML(object):
         member_tag = None
         tag_name = self.get_tag_name_no_ns(tag)
         if tag_name == "B":
-            member_tags = tag.xpath(".//ns:Member", namespaces=self.ns_map)
+            member_tags = self.xpath(tag, ".//ns:Member")
             if len(member_tags) == 1:
                 member_tag = member_tags[0]
         elif tag_name == "Member":
@@ -331,15 +371,14 @@ class BaseParseDayXML(object):
                 if pims_id in (None, "0", "-1"):
                     return self.handle_minus_member(member_tag)
 
+            day = self.resolver.day(self.date)
             if pims_id:  # Old way
-                member = self.resolver.match_by_pims(pims_id, self.date)
+                member = day.match_by_pims(pims_id)
             else:
-                member = self.resolver.match_by_mnis(mnis_id, self.date)
+                member = day.match_by_mnis(mnis_id)
             if member is not None:
                 member["person_id"] = member.get("id")
-                member["name"] = self.resolver.name_on_date(
-                    member["person_id"], self.date
-                )
+                member["name"] = day.name(member["person_id"])
                 if member_tag.get("ContributionType"):
                     member["type"] = member_tag.get("ContributionType")
                 return member
@@ -428,7 +467,7 @@ class BaseParseDayXML(object):
         self.root.append(tag)
 
     def parse_debateheading(self, tag):
-        els = tag.xpath('*[not(processing-instruction("notus-xml"))]')
+        els = self.xpath(tag, '*[not(processing-instruction("notus-xml"))]')
         assert len(els) == 1
         tag = els[0]  # Assume child is the actual heading
         tag_name = self.get_tag_name_no_ns(tag)
@@ -522,9 +561,9 @@ class BaseParseDayXML(object):
         which means the parser skips that tag and doesn't spit out a redundant
         minor heading
         """
-        following = heading.xpath(
+        following = self.xpath(
+            heading,
             "(./following-sibling::ns:hs_2cDebatedMotion|./following-sibling::ns:hs_7SmCapsHdg|./following-sibling::ns:hs_2GenericHdg)",
-            namespaces=self.ns_map,
         )
         text = ""
         if len(following) == 1:
@@ -545,9 +584,7 @@ class BaseParseDayXML(object):
         hs_6bFormalmotion tag in the major heading that we are generating
         when we see the hs_2DebatedMotion tag
         """
-        following = motion.xpath(
-            "./following-sibling::ns:hs_6bFormalmotion", namespaces=self.ns_map
-        )
+        following = self.xpath(motion, "./following-sibling::ns:hs_6bFormalmotion")
         text = ""
         if len(following) == 1:
             text = " - ".join(
@@ -575,9 +612,9 @@ class BaseParseDayXML(object):
         list of ignored tags as we only want to use it as part of this
         minor heading
         """
-        chair = debate.xpath(
+        chair = self.xpath(
+            debate,
             "(./preceding-sibling::ns:hs_76fChair | ./following-sibling::ns:hs_76fChair)",
-            namespaces=self.ns_map,
         )
         if len(chair) == 1:
             chair_text = self.get_single_line_text_from_element(chair[0])
@@ -595,27 +632,27 @@ class BaseParseDayXML(object):
         self.output_heading = True
 
     def parse_question(self, question):
-        member = question.xpath(".//ns:Member", namespaces=self.ns_map)[0]
+        member = self.xpath(question, ".//ns:Member")[0]
         member = self.parse_member(member)
 
-        first_para = question.xpath(".//ns:hs_Para", namespaces=self.ns_map)[0]
+        first_para = self.xpath(question, ".//ns:hs_Para")[0]
         self.new_speech(member, first_para.get("url"))
 
-        number = "".join(question.xpath(".//ns:Number/text()", namespaces=self.ns_map))
+        number = "".join(self.xpath(question, ".//ns:Number/text()"))
         if number != "":
             self.current_speech.set("oral-qnum", number)
 
         p = etree.Element("p")
         p.set("pid", self.get_pid())
-        uin = question.xpath(".//ns:Uin", namespaces=self.ns_map)
+        uin = self.xpath(question, ".//ns:Uin")
         if len(uin) > 0:
-            uin_text = "".join(uin[0].xpath(".//text()"))
+            uin_text = "".join(self.xpath(uin[0], ".//text()"))
             m = re.match("\[\s*(\d+)\s*\]", uin_text)
             if m is not None:
                 no = m.groups(1)[0]
                 p.set("qnum", no)
 
-        text = first_para.xpath(".//ns:QuestionText/text()", namespaces=self.ns_map)
+        text = self.xpath(first_para, ".//ns:QuestionText/text()")
         text = "".join(text)
         """
         sometimes the question text is after the tag rather
@@ -633,8 +670,8 @@ class BaseParseDayXML(object):
         </hs_Para></Question>
         """
         if text == "":
-            q_text = first_para.xpath(
-                ".//ns:QuestionText/following-sibling::text()", namespaces=self.ns_map
+            q_text = self.xpath(
+                first_para, ".//ns:QuestionText/following-sibling::text()"
             )
             if len(q_text):
                 text = "".join(q_text)
@@ -644,9 +681,7 @@ class BaseParseDayXML(object):
 
         # and sometimes there is more question text in following siblings
         # so we need to handle those too
-        following_tags = first_para.xpath(
-            "./following-sibling::*", namespaces=self.ns_map
-        )
+        following_tags = self.xpath(first_para, "./following-sibling::*")
         for t in following_tags:
             tag_name = self.get_tag_name_no_ns(t)
             self.handle_tag(tag_name, t)
@@ -681,12 +716,12 @@ class BaseParseDayXML(object):
         if not self.output_heading:
             self.output_normally_ignored()
 
-        members = para.xpath(".//ns:Member", namespaces=self.ns_map)
+        members = self.xpath(para, ".//ns:Member")
         if member is not None:
             self.new_speech(member, para.get("url"))
         elif members:
             m_name = None
-            bs = members[0].xpath("./ns:B", namespaces=self.ns_map)
+            bs = self.xpath(members[0], "./ns:B")
             if len(bs) == 1:
                 m_name = {"name": re.sub("\s+", " ", bs[0].text).strip()}
             elif len(bs) == 0:
@@ -703,7 +738,7 @@ class BaseParseDayXML(object):
         # this makes the text fetching a bit easier
         if kwargs.get("strip_member", True):
             for m in members:
-                italics = m.xpath(".//ns:I", namespaces=self.ns_map)
+                italics = self.xpath(m, ".//ns:I")
                 text = "".join(
                     self.get_single_line_text_from_element(i) for i in italics
                 )
@@ -718,7 +753,7 @@ class BaseParseDayXML(object):
         if len(text) == 0:
             return
 
-        i = para.xpath("./ns:I", namespaces=self.ns_map)
+        i = self.xpath(para, "./ns:I")
         if len(i) == 1:
             i_text = self.get_single_line_text_from_element(i[0])
             if text == i_text:
@@ -779,7 +814,7 @@ class BaseParseDayXML(object):
         return vote_list
 
     def parse_table(self, wrapper):
-        rows = wrapper.xpath(".//ns:row", namespaces=self.ns_map)
+        rows = self.xpath(wrapper, ".//ns:row")
         tag = etree.Element("table")
         body = etree.Element("tbody")
         url = None
@@ -787,9 +822,8 @@ class BaseParseDayXML(object):
             row_tag = etree.Element("tr")
             row_tag.set("pid", self.get_pid())
 
-            for entry in row.xpath(
-                "(.//ns:hs_TableHeading|.//ns:hs_brev|.//ns:hs_Para|.//ns:hs_para)",
-                namespaces=self.ns_map,
+            for entry in self.xpath(
+                row, "(.//ns:hs_TableHeading|.//ns:hs_brev|.//ns:hs_Para|.//ns:hs_para)"
             ):
                 if url is None:
                     url = entry.get("url")
@@ -813,9 +847,7 @@ class BaseParseDayXML(object):
         tag.set("id", self.get_speech_id())
         tag.set("nospeaker", "true")
         tag.set("divdate", self.date)
-        div_number = division.xpath(
-            ".//ns:" + self.division_number_element, namespaces=self.ns_map
-        )[0]
+        div_number = self.xpath(division, ".//ns:" + self.division_number_element)[0]
         div_number = self.get_single_line_text_from_element(div_number)
 
         tag.set("divnumber", div_number)
@@ -849,12 +881,8 @@ class BaseParseDayXML(object):
                         stamp=tag.get("url"),
                     )
 
-        ayes_count = division.xpath(
-            "./ns:hs_Para/ns:AyesNumber/text()", namespaces=self.ns_map
-        )
-        noes_count = division.xpath(
-            "./ns:hs_Para/ns:NoesNumber/text()", namespaces=self.ns_map
-        )
+        ayes_count = self.xpath(division, "./ns:hs_Para/ns:AyesNumber/text()")
+        noes_count = self.xpath(division, "./ns:hs_Para/ns:NoesNumber/text()")
 
         ayes_count_text = "".join(ayes_count)
         noes_count_text = "".join(noes_count)
@@ -863,15 +891,11 @@ class BaseParseDayXML(object):
 
         tag = self.get_division_tag(division, ayes_count_text, noes_count_text)
 
-        ayes = division.xpath(".//ns:NamesAyes//ns:Member", namespaces=self.ns_map)
-        noes = division.xpath(".//ns:NamesNoes//ns:Member", namespaces=self.ns_map)
+        ayes = self.xpath(division, ".//ns:NamesAyes//ns:Member")
+        noes = self.xpath(division, ".//ns:NamesNoes//ns:Member")
 
-        aye_tellers = division.xpath(
-            ".//ns:TellerNamesAyes//ns:Member", namespaces=self.ns_map
-        )
-        noe_tellers = division.xpath(
-            ".//ns:TellerNamesNoes//ns:Member", namespaces=self.ns_map
-        )
+        aye_tellers = self.xpath(division, ".//ns:TellerNamesAyes//ns:Member")
+        noe_tellers = self.xpath(division, ".//ns:TellerNamesNoes//ns:Member")
 
         aye_list = etree.Element("mplist")
         aye_list.set("vote", "aye")
@@ -888,9 +912,9 @@ class BaseParseDayXML(object):
         self.root.append(tag)
 
         # England/EnglandWales not used since May 2018
-        paras = division.xpath(
+        paras = self.xpath(
+            division,
             "(./ns:hs_Para|./ns:England/ns:hs_Para|./ns:EnglandWales/ns:hs_Para)",
-            namespaces=self.ns_map,
         )
         for para in paras:
             text = self.get_single_line_text_from_element(para)
@@ -899,7 +923,7 @@ class BaseParseDayXML(object):
             self.parse_para(para)
 
     def parse_time(self, tag):
-        time_txt = "".join(tag.xpath(".//text()"))
+        time_txt = "".join(self.xpath(tag, ".//text()"))
         if time_txt == "":
             return
         matches = re.match("(\d+)(?:[:.,]\s*(\d+))?[\xa0\s]*(am|pm)", time_txt)
@@ -953,63 +977,66 @@ class BaseParseDayXML(object):
             self.current_col = col
             self.next_speech_num = 0
 
-    def handle_tag(self, tag_name, tag):
-        handled = True
+    def parse_debbill(self, tag):
+        if self.debate_type == "westminhall":
+            self.parse_WHDebate(tag)
+        elif self.debate_type == "debate":
+            self.parse_major(tag)
+
+    # Built once for each class from its lists of tags. Where a tag is in
+    # more than one list the first wins, as it would in a chain of ifs.
+    # Ignored tags map to None.
+    @classmethod
+    def get_tag_methods(cls):
+        methods = cls.tag_methods_cache.get(cls)
+        if methods is None:
+            methods = {}
+            for tags, method in (
+                (["hs_6fDate"], "parse_date"),
+                (cls.oral_headings, "parse_oral_heading"),
+                (["hs_3cOppositionDay"], "parse_opposition"),
+                (["hs_2DebatedMotion"], "parse_debated_motion"),
+                (["hs_2DebBill"], "parse_debbill"),
+                (cls.major_headings, "parse_major"),
+                (cls.chair_headings, "parse_chair"),
+                (cls.minor_headings, "parse_minor"),
+                (cls.generic_headings, "parse_generic"),
+                (cls.whall_headings, "parse_WHDebate"),
+                (["Question"], "parse_question"),
+                (["hs_8Petition"], "parse_petition"),
+                (cls.indents, "parse_indent"),
+                (cls.paras, "parse_para"),
+                (["hs_brev", "hs_brevIndent"], "parse_brev"),
+                (["TableWrapper"], "parse_table"),
+                (["Division"], "parse_division"),
+                (["hs_Timeline"], "parse_time"),
+                (cls.ignored_tags, None),
+            ):
+                for tag_name in tags:
+                    methods.setdefault(tag_name, method)
+            cls.tag_methods_cache[cls] = methods
+        return methods
 
+    def handle_tag(self, tag_name, tag):
         if self.skip_tag is not None and tag_name == self.skip_tag:
             self.skip_tag = None
-        elif tag_name == "hs_6fDate":
-            self.parse_date(tag)
-        elif tag_name in self.oral_headings:
-            self.parse_oral_heading(tag)
-        elif tag_name == "hs_3cOppositionDay":
-            self.parse_opposition(tag)
-        elif tag_name == "hs_2DebatedMotion":
-            self.parse_debated_motion(tag)
-        elif tag_name == "DebateHeading":
-            handled = self.parse_debateheading(tag)
-        elif tag_name == "hs_2DebBill":
-            if self.debate_type == "westminhall":
-                self.parse_WHDebate(tag)
-            elif self.debate_type == "debate":
-                self.parse_major(tag)
-        elif tag_name in self.major_headings:
-            self.parse_major(tag)
-        elif tag_name in self.chair_headings:
-            self.parse_chair(tag)
-        elif tag_name in self.minor_headings:
-            self.parse_minor(tag)
-        elif tag_name in self.generic_headings:
-            self.parse_generic(tag)
-        elif tag_name in self.whall_headings:
-            self.parse_WHDebate(tag)
-        elif tag_name == "Question":
-            self.parse_question(tag)
-        elif tag_name == "hs_8Petition":
-            self.parse_petition(tag)
-        elif tag_name in self.indents:
-            self.parse_indent(tag)
-        elif tag_name in self.paras:
-            self.parse_para(tag)
-        elif tag_name == "hs_brev" or tag_name == "hs_brevIndent":
-            self.parse_brev(tag)
-        elif tag_name == "TableWrapper":
-            self.parse_table(tag)
-        elif tag_name == "Division":
-            self.parse_division(tag)
-        elif tag_name == "hs_Timeline":
-            self.parse_time(tag)
-        elif tag_name in self.ignored_tags:
-            pass
-        elif tag_name in self.empty_tags:
-            if len(tag) != 0 or tag.text:
-                handled = False
-        else:
-            handled = False
+            return True
+        if tag_name == "DebateHeading":
+            return self.parse_debateheading(tag)
 
-        return handled
+        methods = self.get_tag_methods()
+        if tag_name in methods:
+            if methods[tag_name] is not None:
+                getattr(self, methods[tag_name])(tag)
+            return True
+        if tag_name in self.empty_tags:
+            return len(tag) == 0 and not tag.text
+        return False
 
     def parse_day(self, xml_file):
+        if self.streaming:
+            return self.parse_day_streaming(xml_file)
+
         ok = self.setup_parser(xml_file)
         if not ok:
             return False
@@ -1017,59 +1044,156 @@ class BaseParseDayXML(object):
         self.root.set("latest", "yes")
         self.current_col = self.input_root[0].get("ColStart")
 
-        headers = self.input_root[0].xpath(
-            ".//ns:Fragment/ns:Header", namespaces=self.ns_map
-        )
+        headers = self.xpath(self.input_root[0], ".//ns:Fragment/ns:Header")
         self.parse_system_header(headers[0])
 
-        body_tags = self.input_root[0].xpath(
-            ".//ns:Fragment/ns:Body", namespaces=self.ns_map
-        )
+        body_tags = self.xpath(self.input_root[0], ".//ns:Fragment/ns:Body")
         for b in body_tags:
-            for tag in b:
-                # column numbers are contained in processing
-                # instructions so first check if the tag is
-                # one of those because then we don't need to
-                # process any further
-                if type(tag) is etree._ProcessingInstruction:
-                    self.parse_pi(tag)
-                    continue
-
-                # PI handling - if it's right at the start, do
-                # the column change now rather than after
-                self.check_for_pi_at_start(tag)
-
-                tag_name = self.get_tag_name_no_ns(tag)
-                if self.verbose >= 2:
-                    start_tag = re.sub(">.*", ">", etree.tounicode(tag))
-                    print("Parsing %s" % start_tag)
-                if not self.handle_tag(tag_name, tag):
-                    raise ContextException(
-                        "unhandled tag: {0}".format(tag_name),
-                        fragment=etree.tostring(tag),
-                        stamp=tag.get("url"),
-                    )
-
-                # PI handling - check inside all tags for processing
-                # instructions to make sure we catch all column changes
-                self.check_for_pi(tag)
+            self.parse_body(b)
 
         # make sure we add any outstanding speech.
         self.clear_current_speech()
 
         return True
 
+    def parse_body(self, body):
+        for tag in body:
+            # column numbers are contained in processing
+            # instructions so first check if the tag is
+            # one of those because then we don't need to
+            # process any further
+            if type(tag) is etree._ProcessingInstruction:
+                self.parse_pi(tag)
+                continue
+
+            # PI handling - if it's right at the start, do
+            # the column change now rather than after
+            self.check_for_pi_at_start(tag)
+
+            tag_name = self.get_tag_name_no_ns(tag)
+            if self.verbose >= 2:
+                start_tag = re.sub(">.*", ">", etree.tounicode(tag))
+                print("Parsing %s" % start_tag)
+            if not self.handle_tag(tag_name, tag):
+                raise ContextException(
+                    "unhandled tag: {0}".format(tag_name),
+                    fragment=etree.tostring(tag),
+                    stamp=tag.get("url"),
+                )
+
+            # PI handling - check inside all tags for processing
+            # instructions to make sure we catch all column changes
+            self.check_for_pi(tag)
+
     def get_date(self, xml_file):
+        if self.streaming:
+            for fragment in self.iter_fragments(xml_file):
+                headers = self.xpath(fragment, "./ns:Header")
+                if headers:
+                    self.parse_system_header(headers[0])
+                    return self.date
+            return False
+
         ok = self.setup_parser(xml_file)
         if not ok:
             return False
 
-        headers = self.input_root[0].xpath(
-            ".//ns:Fragment/ns:Header", namespaces=self.ns_map
-        )
+        headers = self.xpath(self.input_root[0], ".//ns:Fragment/ns:Header")
         self.parse_system_header(headers[0])
         return self.date
 
+    # Goes through the Fragments of the System being parsed as each is read,
+    # throwing them away once the caller is done with them, so only one is
+    # in memory at a time. As the tags are handled a Body at a time, and
+    # only ever look at others in the same Body, this is the same as
+    # parsing the whole file.
+    def iter_fragments(self, xml_file):
+        self.ns = self.type_to_xpath[self.debate_type][1]
+        self.ns_map = {"ns": self.ns}
+        system_type = re.search(
+            '@type="([^"]*)"', self.type_to_xpath[self.debate_type][0]
+        ).group(1)
+        system_tag = "{%s}System" % self.ns
+        fragment_tag = "{%s}Fragment" % self.ns
+
+        self.input_system = None
+        with open_source(xml_file.name, binary=True) as source:
+            for event, el in etree.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    if (
+                        el.tag == system_tag
+                        and el.get("type") == system_type
+                        and self.input_system is None
+                    ):
+                        self.input_system = el
+                elif el.tag == fragment_tag:
+                    if self.input_system is not None:
+                        yield el
+                    el.clear()
+                    while el.getprevious() is not None:
+                        del el.getparent()[0]
+                elif el is self.input_system:
+                    # only the first System of the type is parsed
+                    return
+
+        if self.input_system is None and self.verbose >= 1:
+            sys.stderr.write(
+                "Failed to find any debates of type {0} in {1}\n".format(
+                    self.debate_type, xml_file.name
+                )
+            )
+
+    def parse_day_streaming(self, xml_file):
+        self.root = etree.Element("publicwhip")
+        self.root.set("scraperversion", self.rev)
+        self.root.set("latest", "yes")
+
+        # the header has to be read first, so hold on to any Fragments
+        # which come before the one it is in
+        waiting = []
+        header_read = False
+        for fragment in self.iter_fragments(xml_file):
+            if not header_read:
+                headers = self.xpath(fragment, "./ns:Header")
+                if not headers:
+                    waiting.append(copy.deepcopy(fragment))
+                    continue
+                self.current_col = self.input_system.get("ColStart")
+                self.parse_system_header(headers[0])
+                header_read = True
+            for f in waiting + [fragment]:
+                for body in self.xpath(f, "./ns:Body"):
+                    self.parse_body(body)
+            waiting = []
+            self.flush_output()
+
+        if self.input_system is None:
+            return False
+
+        # make sure we add any outstanding speech.
+        self.clear_current_speech()
+        return True
+
+    # Writes out, and drops, the finished elements of the output, in the
+    # same form as they would have in the pretty printed whole document
+    def flush_output(self):
+        if len(self.root) == 0:
+            return
+        text = etree.tounicode(self.root, pretty_print=True)
+        start, _, text = text.partition("\n")
+        if not self.output_started:
+            self.output_stream.write(start + "\n")
+            self.output_started = True
+        self.output_stream.write(text[: -len("</publicwhip>\n")])
+        del self.root[:]
+
+    def finish_output(self):
+        self.flush_output()
+        if self.output_started:
+            self.output_stream.write("</publicwhip>\n")
+        else:
+            self.output_stream.write(etree.tounicode(self.root, pretty_print=True))
+
     def get_parser(self, xml_file):
         return etree.parse(xml_file)
 
@@ -1082,7 +1206,10 @@ class BaseParseDayXML(object):
         self.ns_map = {"ns": self.ns}
         root_xpath = self.type_to_xpath[self.debate_type][0]
 
-        self.xml_root = self.get_parser(xml_file).getroot()
+        if self.source is not None:
+            self.xml_root = self.source.getroot()
+        else:
+            self.xml_root = self.get_parser(xml_file).getroot()
         self.input_root = self.xml_root.xpath(root_xpath, namespaces=self.ns_map)
         if len(self.input_root) == 0:
             if self.verbose >= 1:
@@ -1124,7 +1251,7 @@ class PBCParseDayXML(BaseParseDayXML):
     def get_member_with_no_id(self, member_tag):
         name = member_tag.text
         if not name:
-            bs = member_tag.xpath("./ns:B", namespaces=self.ns_map)
+            bs = self.xpath(member_tag, "./ns:B")
             if bs:
                 name = bs[0].text
 
@@ -1139,14 +1266,14 @@ class PBCParseDayXML(BaseParseDayXML):
     # we want the immediately preceding one which will be the last one
     # in the array
     def get_attending_status(self, member_tag):
-        text = member_tag.xpath("./preceding-sibling::text()")
+        text = self.xpath(member_tag, "./preceding-sibling::text()")
         if len(text) > 0 and re.search("\u2020", text[-1]):
             return "true"
 
         return "false"
 
     def parse_chairmen(self, chair):
-        member_tags = chair.xpath(".//ns:Member", namespaces=self.ns_map)
+        member_tags = self.xpath(chair, ".//ns:Member")
         for member_tag in member_tags:
             member = self.parse_member(member_tag)
             if member is None:
@@ -1163,12 +1290,12 @@ class PBCParseDayXML(BaseParseDayXML):
                 )
 
     def parse_clmember(self, clmember):
-        member_tag = clmember.xpath(".//ns:Member", namespaces=self.ns_map)[0]
+        member_tag = self.xpath(clmember, ".//ns:Member")[0]
         member = self.parse_member(member_tag)
         if member is None:
             member = self.get_member_with_no_id(member_tag)
 
-        cons_tags = member_tag.xpath(".//ns:I", namespaces=self.ns_map)
+        cons_tags = self.xpath(member_tag, ".//ns:I")
         cons = ""
         if len(cons_tags) == 1:
             cons_tag = cons_tags[0]
@@ -1208,11 +1335,7 @@ class PBCParseDayXML(BaseParseDayXML):
         committee.append(chairmen)
 
         def current_membership(pid):
-            members = self.resolver.persontomembermap[pid]
-            members = [self.resolver.members[mid] for mid in members]
-            members = [
-                m for m in members if m["start_date"] <= self.date <= m["end_date"]
-            ]
+            members = self.resolver.day(self.date).memberships(pid)
             assert len(members) == 1
             return members[0]
 
@@ -1290,9 +1413,7 @@ class PBCParseDayXML(BaseParseDayXML):
     def get_division_tag(self, division, yes_text, no_text):
         tag = etree.Element("divisioncount")
 
-        div_number = division.xpath(
-            ".//ns:" + self.division_number_element, namespaces=self.ns_map
-        )[0]
+        div_number = self.xpath(division, ".//ns:" + self.division_number_element)[0]
         div_number = self.get_single_line_text_from_element(div_number)
 
         tag.set("id", self.get_speech_id())
@@ -1314,7 +1435,7 @@ class PBCParseDayXML(BaseParseDayXML):
         self.current_speech.append(tag)
 
     def parse_table(self, table):
-        paras = table.xpath("(.//ns:hs_Para|.//ns:hs_brev)", namespaces=self.ns_map)
+        paras = self.xpath(table, "(.//ns:hs_Para|.//ns:hs_brev)")
         for para in paras:
             tag_name = self.get_tag_name_no_ns(para)
             if tag_name == "hs_Para":
@@ -1343,7 +1464,7 @@ class PBCParseDayXML(BaseParseDayXML):
             self.new_speech(None, para.get("url"))
 
         if has_witness:
-            for w in para.xpath(".//ns:Witness", namespaces=self.ns_map):
+            for w in self.xpath(para, ".//ns:Witness"):
                 w.getparent().text = w.tail
                 w.getparent().remove(w)
             self.parse_para_with_member(para, None)
@@ -1389,15 +1510,15 @@ class PBCParseDayXML(BaseParseDayXML):
             return False
 
         # This isn't nice.
-        fragment = self.input_root[0].xpath(".//ns:Fragment", namespaces=self.ns_map)[0]
+        fragment = self.xpath(self.input_root[0], ".//ns:Fragment")[0]
         self.session, debate_num = re.search(
             "Commons/(\d{4}_\d{4})/Committee_\d+/Debate_(\d+)/Sitting_\d+",
             fragment.get("__uri__"),
         ).groups()
-        header = fragment.xpath("./ns:Header", namespaces=self.ns_map)[0]
+        header = self.xpath(fragment, "./ns:Header")[0]
         try:
             # The sitting number is only given in a random attribute
-            data_id = header.xpath("./ns:SystemDataId", namespaces=self.ns_map)[0]
+            data_id = self.xpath(header, "./ns:SystemDataId")[0]
             data_id = self.get_single_line_text_from_element(data_id)
             sitting_num = int(re.match("P(?:BC|MB)\s*\d+-(\d+)", data_id).group(1))
         except:
@@ -1407,13 +1528,11 @@ class PBCParseDayXML(BaseParseDayXML):
             )
 
         try:
-            title = header.xpath("./ns:Title", namespaces=self.ns_map)[0]
+            title = self.xpath(header, "./ns:Title")[0]
             title = self.get_single_line_text_from_element(title)
         except:
-            fragment = self.xml_root.xpath(".//ns:Fragment", namespaces=self.ns_map)[0]
-            title = fragment.xpath(".//ns:Cover", namespaces=self.ns_map)[0].get(
-                "debate"
-            )
+            fragment = self.xpath(self.xml_root, ".//ns:Fragment")[0]
+            title = self.xpath(fragment, ".//ns:Cover")[0].get("debate")
 
         title = title.partition(" ")[0].upper()
 
@@ -1430,7 +1549,7 @@ class PBCParseDayXML(BaseParseDayXML):
 
 
 class LordsParseDayXML(BaseParseDayXML):
-    resolver = LordsList()
+    resolver = lordsList
 
     paras = [
         "hs_para",
@@ -1472,7 +1591,7 @@ class LordsParseDayXML(BaseParseDayXML):
 
         tag.text = re.sub("\n", " ", quote.text)
 
-        i = quote.xpath("./ns:I", namespaces=self.ns_map)
+        i = self.xpath(quote, "./ns:I")
         if len(i) == 1:
             i_text = self.get_single_line_text_from_element(i[0])
             new_i = etree.Element("i")
@@ -1524,14 +1643,12 @@ class LordsParseDayXML(BaseParseDayXML):
         return found_member
 
     def parse_newdebate(self, tag):
-        time = tag.xpath(".//ns:hs_time", namespaces=self.ns_map)
+        time = self.xpath(tag, ".//ns:hs_time")
         if len(time):
             self.parse_time(time[0])
 
-        heading = tag.xpath(
-            ".//ns:hs_DebateHeading|.//hs_AmendmentHeading", namespaces=self.ns_map
-        )
-        debate_type = tag.xpath(".//ns:hs_DebateType", namespaces=self.ns_map)
+        heading = self.xpath(tag, ".//ns:hs_DebateHeading|.//hs_AmendmentHeading")
+        debate_type = self.xpath(tag, ".//ns:hs_DebateType")
         if len(heading):
             if len(debate_type):
                 text = self.get_single_line_text_from_element(debate_type[0])
@@ -1544,24 +1661,24 @@ class LordsParseDayXML(BaseParseDayXML):
             )
             return
 
-        # procedure = tag.xpath('.//ns:hs_Procedure', namespaces=self.ns_map)
+        # procedure = self.xpath(tag, './/ns:hs_Procedure')
         # if len(procedure) == 1:
         #    self.handle_para(procedure[0])
 
         want_member = tag.get("BusinessType") in ("Question", "GeneralDebate")
 
         member = None
-        member_tags = tag.xpath(".//ns:Member", namespaces=self.ns_map)
+        member_tags = self.xpath(tag, ".//ns:Member")
         if len(member_tags):
             if want_member:
                 member = self.parse_member(member_tags[0])
             else:
-                tabledby_tags = tag.xpath(".//ns:hs_TabledBy", namespaces=self.ns_map)
+                tabledby_tags = self.xpath(tag, ".//ns:hs_TabledBy")
                 self.parse_para_with_member(
                     tabledby_tags[0], None, css_class="italic", strip_member=False
                 )
 
-        questions = tag.xpath(".//ns:hs_Question", namespaces=self.ns_map)
+        questions = self.xpath(tag, ".//ns:hs_Question")
         for question in questions:
             self.parse_para_with_member(question, member if want_member else None)
 
@@ -1597,12 +1714,8 @@ class LordsParseDayXML(BaseParseDayXML):
         self.current_speech.append(tag)
 
     def parse_division(self, division):
-        ayes_count = division.xpath(
-            ".//ns:ContentsNumber/text()", namespaces=self.ns_map
-        )
-        noes_count = division.xpath(
-            ".//ns:NotContentsNumber/text()", namespaces=self.ns_map
-        )
+        ayes_count = self.xpath(division, ".//ns:ContentsNumber/text()")
+        noes_count = self.xpath(division, ".//ns:NotContentsNumber/text()")
 
         ayes_count_text = "".join(ayes_count)
         noes_count_text = "".join(noes_count)
@@ -1619,12 +1732,8 @@ class LordsParseDayXML(BaseParseDayXML):
 
         tag = self.get_division_tag(division, ayes_count_text, noes_count_text)
 
-        ayes = division.xpath(
-            ".//ns:NamesContents//ns:hs_DivListNames", namespaces=self.ns_map
-        )
-        noes = division.xpath(
-            ".//ns:NamesNotContents//ns:hs_DivListNames", namespaces=self.ns_map
-        )
+        ayes = self.xpath(division, ".//ns:NamesContents//ns:hs_DivListNames")
+        noes = self.xpath(division, ".//ns:NamesNotContents//ns:hs_DivListNames")
 
         aye_list = etree.Element("lordlist")
         aye_list.set("vote", "content")
@@ -1638,9 +1747,9 @@ class LordsParseDayXML(BaseParseDayXML):
 
         self.root.append(tag)
 
-        paras = division.xpath("./ns:hs_Procedure", namespaces=self.ns_map)
+        paras = self.xpath(division, "./ns:hs_Procedure")
         for para in paras:
-            text = "".join(para.xpath(".//text()"))
+            text = "".join(self.xpath(para, ".//text()"))
             if re.search(r"Contents", text) or re.search(r"Division\s*on", text):
                 continue
             self.parse_para(para)
@@ -1663,7 +1772,7 @@ class LordsParseDayXML(BaseParseDayXML):
             tag.set("vote", direction)
             if is_teller:
                 tag.set("teller", "yes")
-            tag.text = self.resolver.name_on_date(member, self.date)
+            tag.text = self.resolver.day(self.date).name(member)
             vote_list.append(tag)
 
         return vote_list
@@ -1697,6 +1806,217 @@ class LordsParseDayXML(BaseParseDayXML):
         return handled
 
 
+# Remembers what parsing each source file gave, keyed by a hash of its
+# contents along with the versions of the parser code and the members data,
+# as those are all the output depends on. When the same file turns up again,
+# e.g. republished in a later zip or in a backfill, and the latest output for
+# its day still has the digest it gave before, it needn't be parsed again.
+class ParseCache(object):
+    # the modules the output comes from, so changes elsewhere don't mean
+    # everything is parsed again
+    code_files = [
+        "new_hansard.py",
+        "gidmatching.py",
+        "base_resolver.py",
+        "resolvemembernames.py",
+        "lords/resolvenames.py",
+        "xmlfilewrite.py",
+        "../filtersentence_xml.py",
+    ]
+    members_files = ["../members/*.json"]
+    # turned off to parse everything again, still noting what it gave
+    lookup = True
+
+    def __init__(self, filename, code=None, members=None):
+        self.filename = filename
+        self.code = code or self.hash_files(self.code_files)
+        self.members = members or self.hash_files(self.members_files)
+        self.digests = {}
+
+        self.db = sqlite3.connect(filename, timeout=60)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS parsed (
+                input TEXT,
+                debate_type TEXT,
+                code TEXT,
+                members TEXT,
+                sitting TEXT,
+                output_file TEXT,
+                digest TEXT,
+                parsed_at TEXT,
+                PRIMARY KEY (input, debate_type, code, members)
+            )"""
+        )
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS digests (
+                output_file TEXT PRIMARY KEY,
+                code TEXT,
+                size INTEGER,
+                mtime INTEGER,
+                lines INTEGER,
+                checkpoints TEXT,
+                digest TEXT
+            )"""
+        )
+        # anything from other versions can't be used again
+        with self.db:
+            self.db.execute(
+                "DELETE FROM parsed WHERE code != ? OR members != ?",
+                (self.code, self.members),
+            )
+            self.db.execute("DELETE FROM digests WHERE code != ?", (self.code,))
+
+    def hash_files(self, patterns):
+        key = hashlib.sha1()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for pattern in patterns:
+            for filename in sorted(glob.glob(os.path.join(here, pattern))):
+                with open(filename, "rb") as f:
+                    key.update(f.read())
+        return key.hexdigest()
+
+    # each file is usually asked about for more than one type in a row
+    def file_digest(self, filename):
+        if filename not in self.digests:
+            with open_source(filename, binary=True) as f:
+                self.digests = {filename: hashlib.sha1(f.read()).hexdigest()}
+        return self.digests[filename]
+
+    # returns the sitting (the date, or the sitting ID for PBC files) and
+    # the digest of the output from parsing a file, if it has been before.
+    # Files with nothing of the type in have a sitting of None.
+    def get(self, filename, debate_type):
+        if not self.lookup:
+            return None
+        return self.db.execute(
+            """SELECT sitting, digest FROM parsed
+                WHERE input = ? AND debate_type = ? AND code = ? AND members = ?""",
+            (self.file_digest(filename), debate_type, self.code, self.members),
+        ).fetchone()
+
+    def add(self, filename, debate_type, sitting, output_file=None, digest=None):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO parsed VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.file_digest(filename),
+                    debate_type,
+                    self.code,
+                    self.members,
+                    sitting,
+                    output_file,
+                    digest,
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+
+    # the FileDigest of an output file, as long as it hasn't changed since
+    def get_digest(self, output_file):
+        st = os.stat(output_file)
+        row = self.db.execute(
+            """SELECT lines, checkpoints, digest FROM digests
+                WHERE output_file = ? AND code = ? AND size = ? AND mtime = ?""",
+            (output_file, self.code, st.st_size, st.st_mtime_ns),
+        ).fetchone()
+        if row is None:
+            return None
+        return FileDigest(row[0], row[1].split(), row[2])
+
+    def add_digest(self, output_file, digest):
+        st = os.stat(output_file)
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    output_file,
+                    self.code,
+                    st.st_size,
+                    st.st_mtime_ns,
+                    digest.lines,
+                    " ".join(digest.checkpoints),
+                    digest.digest,
+                ),
+            )
+
+    def close(self):
+        self.db.close()
+
+
+# The gid letters for the version of a file, which are ignored when comparing
+# versions. None of these match across lines.
+gid_normalisations = [
+    (re.compile("(publicwhip\/[a-z]*\/\d{4}-\d{2}-\d{2})[a-z]"), r"\1"),
+    (re.compile("(publicwhip\/standing\/.*?\d{4}-\d{2}-\d{2})[a-z]"), r"\1"),
+    (re.compile('(pid=")[a-z]([\d.\/]*")'), r"\1\2"),
+]
+
+
+# A hash of a scrapedxml file as compare_xml_files sees it, which is the lines
+# after the first with the gids normalised. The hash so far is noted every
+# block of lines, so another file can be checked against it as it is read,
+# stopping at the first block that differs.
+class FileDigest(object):
+    block = 1000
+
+    def __init__(self, lines, checkpoints, digest):
+        self.lines = lines  # including the first
+        self.checkpoints = checkpoints
+        self.digest = digest
+
+    # the normalised text of each block of lines, up to the given number
+    @classmethod
+    def read_blocks(cls, xml_file, lines=None):
+        seen = 0
+        while lines is None or seen < lines:
+            size = cls.block if lines is None else min(cls.block, lines - seen)
+            block = list(islice(xml_file, size))
+            if not block:
+                break
+            seen += len(block)
+            text = "".join(block)
+            for pattern, replacement in gid_normalisations:
+                text = pattern.sub(replacement, text)
+            yield len(block), text.encode("utf-8")
+
+    @classmethod
+    def from_file(cls, filename):
+        with io.open(filename, encoding="utf-8") as xml_file:
+            lines = 1 if xml_file.readline() else 0
+            key = hashlib.sha1()
+            checkpoints = []
+            for i, (count, text) in enumerate(cls.read_blocks(xml_file)):
+                if i:
+                    checkpoints.append(key.hexdigest())
+                key.update(text)
+                lines += count
+        return cls(lines, checkpoints, key.hexdigest())
+
+    # SAME if the file has the same lines as this one, EXTENSION if it has
+    # them followed by more, otherwise DIFFERENT
+    def compare(self, filename):
+        with io.open(filename, encoding="utf-8") as xml_file:
+            lines = 1 if xml_file.readline() else 0
+            key = hashlib.sha1()
+            blocks = self.read_blocks(xml_file, max(self.lines - 1, 0))
+            for i, (count, text) in enumerate(blocks):
+                if i and key.hexdigest() != self.checkpoints[i - 1]:
+                    return "DIFFERENT"
+                key.update(text)
+                lines += count
+            if lines < self.lines or key.hexdigest() != self.digest:
+                return "DIFFERENT"
+            if lines > self.lines or xml_file.readline():
+                return "EXTENSION"
+        return "SAME"
+
+
+# The resolvers are only loaded when first used. This loads them now, so
+# that processes forked afterwards share them rather than each loading them.
+def load_resolvers():
+    for resolver in (BaseParseDayXML.resolver, LordsParseDayXML.resolver, memberList):
+        resolver.load()
+
+
 class ParseDay(object):
     valid_types = ["debate", "westminhall", "lords", "standing"]
 
@@ -1714,7 +2034,17 @@ class ParseDay(object):
         "standing": "standing",
     }
 
+    parser_types = {
+        "lords": LordsParseDayXML,
+        "standing": PBCParseDayXML,
+    }
+    # Lords files have their PIs stripped across the whole document first,
+    # and PBC files are read from the top for the sitting, so neither can
+    # be streamed
+    streaming_types = ["debate", "westminhall"]
+
     parser = None
+    parse_cache = None
 
     def reset(self):
         self.prev_file = None
@@ -1722,21 +2052,12 @@ class ParseDay(object):
         self.parser = None
 
     def get_output_pbc_filename(self, date, xml_file):
-        shortnamemap = {}
-        pwstandingpages = os.path.join(pwxmldirs, "standing")
-        for f in os.listdir(pwstandingpages):
-            m = re.match("(standing.*?)([a-z]*)\.xml$", f)
-            if m:
-                shortnamemap.setdefault(m.group(1), []).append(
-                    (miscfuncs.AlphaStringToOrder(m.group(2)), m.group(2), f)
-                )
-            elif f.endswith("~") or f == "changedates.txt":
-                pass
-            elif os.path.isfile(os.path.join(pwstandingpages, f)):
-                print("not recognized file:", f, " in ", pwstandingpages)
-
         self.parser.get_sitting(xml_file)
-        sitting_id = self.parser.sitting_id
+        return self.get_sitting_filenames(self.parser.sitting_id)
+
+    def get_sitting_filenames(self, sitting_id):
+        pwstandingpages = os.path.join(pwxmldirs, "standing")
+        shortnamemap = ScanDayDir(pwstandingpages, "(standing.*?)([a-z]*)\.xml$")
 
         dgflatestalpha, dgflatest = "", None
         if sitting_id in shortnamemap:
@@ -1790,34 +2111,24 @@ class ParseDay(object):
         return flatb
 
     def normalise_gids(self, string):
-        string = re.sub("(publicwhip\/[a-z]*\/\d{4}-\d{2}-\d{2})[a-z]", r"\1", string)
-        string = re.sub(
-            "(publicwhip\/standing\/.*?\d{4}-\d{2}-\d{2})[a-z]", r"\1", string
-        )
-        string = re.sub('(pid=")[a-z]([\d.\/]*")', r"\1\2", string)
-
+        for pattern, replacement in gid_normalisations:
+            string = pattern.sub(replacement, string)
         return string
 
+    # The digest of the previous version is kept in the parse cache, so
+    # only the new file needs reading, and only until it differs
     def compare_xml_files(self, prevfile, nextfile):
-        hprevfile = io.open(prevfile, encoding="utf-8")
-        dprevfile = hprevfile.readlines()
-        hprevfile.close()
-
-        hnextfile = io.open(nextfile, encoding="utf-8")
-        dnextfile = hnextfile.readlines()
-        hnextfile.close()
-
-        if len(dprevfile) == len(dnextfile):
-            sprevfile = self.normalise_gids("".join(dprevfile[1:]))
-            snextfile = self.normalise_gids("".join(dnextfile[1:]))
-            if sprevfile == snextfile:
-                return "SAME"
-        if len(dprevfile) < len(dnextfile):
-            sprevfile = self.normalise_gids("".join(dprevfile[1:]))
-            snextfile = self.normalise_gids("".join(dnextfile[1 : len(dprevfile)]))
-            if sprevfile == snextfile:
-                return "EXTENSION"
-        return "DIFFERENT"
+        return self.get_file_digest(prevfile).compare(nextfile)
+
+    def get_file_digest(self, filename):
+        digest = None
+        if self.parse_cache is not None:
+            digest = self.parse_cache.get_digest(filename)
+        if digest is None:
+            digest = FileDigest.from_file(filename)
+            if self.parse_cache is not None:
+                self.parse_cache.add_digest(filename, digest)
+        return digest
 
     def remove_para_newlines(self, string):
         return re.sub(
@@ -1828,16 +2139,9 @@ class ParseDay(object):
             string,
         )
 
-    def rewrite_previous_version(self, newfile):
-        # open the old and new XML files
-        xin = io.open(self.prev_file, encoding="utf-8")
-        xprevs = xin.read()
-        xin.close()
-
-        xin = io.open(newfile, encoding="utf-8")
-        xcur = xin.read()
-        xin.close()
-
+    # works out the gidredirects from the previous version of a file to the
+    # new one, returning the contents for the rewritten previous version
+    def diff_versions(self, xprevs, xcur):
         xprevs = self.remove_para_newlines(xprevs)
         xcur = self.remove_para_newlines(xcur)
 
@@ -1846,17 +2150,29 @@ class ParseDay(object):
         mpc = re.search("<publicwhip([^>]*)>([\s\S]*?)</publicwhip>", xcur)
 
         if mpc is None or mpw is None:
-            sys.stderr.write("Failed to do diff for {0}\n".format(self.prev_file))
-            return
+            return None
 
         # take the XML string and turn it into the data structures used
         # by the diffing code, then do the diffing
         essflatbindx, essflatblist, oldchks = PrepareXMLForDiff(mpc.group(2))
         essxindx, essxlist, chks = PrepareXMLForDiff(mpw.group(2))
         flatb = self.gen_flatb(oldchks)
-        xprevcompress = DoFactorDiff(
-            essflatbindx, essflatblist, essxindx, essxlist, chks, flatb
-        )
+        return DoFactorDiff(essflatbindx, essflatblist, essxindx, essxlist, chks, flatb)
+
+    def rewrite_previous_version(self, newfile):
+        # open the old and new XML files
+        xin = io.open(self.prev_file, encoding="utf-8")
+        xprevs = xin.read()
+        xin.close()
+
+        xin = io.open(newfile, encoding="utf-8")
+        xcur = xin.read()
+        xin.close()
+
+        xprevcompress = self.diff_versions(xprevs, xcur)
+        if xprevcompress is None:
+            sys.stderr.write("Failed to do diff for {0}\n".format(self.prev_file))
+            return
 
         # spit out the rewritten previous version with redirects
         tempfilenameoldxml = tempfile.mktemp(
@@ -1870,23 +2186,93 @@ class ParseDay(object):
         foout.write("</publicwhip>\n\n")
         foout.close()
         assert os.path.isfile(self.prev_file)
+        folder, ldfile = os.path.split(self.output_file)
+        before = FolderMtime(folder)
         os.remove(self.prev_file)
         os.rename(newfile, self.output_file)
         os.rename(tempfilenameoldxml, self.prev_file)
+        NoteDayFile(folder, ldfile, before)
 
     def output(self, stream):
+        if self.parser.streaming:
+            # most of it has been written already
+            self.parser.finish_output()
+            return
         stream.write(etree.tounicode(self.parser.root, pretty_print=True))
 
-    def handle_file(self, filename, debate_type, verbose):
+    # Parses the XML of a file so it can be passed to handle_file for each
+    # type of debate in it, rather than being parsed again for each. CHAN
+    # files have both the debates and Westminster Hall, each in its own
+    # System element, and parsing one only changes that part of the tree.
+    def load_source(self, filename, debate_type):
+        parser = self.parser_types.get(debate_type, CommonsParseDayXML)()
+        with open_source(filename) as xml_file:
+            return parser.get_parser(xml_file)
+
+    # Uses the parse cache to tell, without parsing, that a file would give
+    # what is already there, returning what handle_file would in that case,
+    # or None if it needs parsing
+    def cached_result(self, filename, debate_type):
+        if self.parse_cache is None:
+            return None
+        cached = self.parse_cache.get(filename, debate_type)
+        if cached is None:
+            return None
+        sitting, digest = cached
+        if sitting is None:
+            return "not-present"
+
+        if debate_type == "standing":
+            prev_file, output_file = self.get_sitting_filenames(sitting)
+        else:
+            prev_file, output_file = self.get_output_filename(sitting, debate_type)
+        if prev_file is None or self.get_file_digest(prev_file).digest != digest:
+            return None
+
+        self.prev_file = prev_file
+        self.output_file = output_file
+        return "same"
+
+    def add_cached_result(self, filename, debate_type, output_file, digest):
+        if self.parse_cache is None:
+            return
+        if debate_type == "standing":
+            sitting = self.parser.sitting_id
+        else:
+            sitting = self.parser.date
+        self.parse_cache.add(filename, debate_type, sitting, output_file, digest.digest)
+        # a new output file is what was parsed, so it needn't be read again
+        # to compare it with the next version
+        if output_file == self.output_file:
+            self.parse_cache.add_digest(output_file, digest)
+
+    # With stream, Commons files are read and written a Fragment at a time,
+    # so memory use doesn't grow with the length of the sitting
+    def handle_file(self, filename, debate_type, verbose, source=None, stream=False):
         if debate_type not in self.valid_types:
             sys.stderr.write("{0} not a valid type".format(debate_type))
             sys.exit()
 
-        xml_file = io.open(filename, encoding="utf-8")
+        ret = self.cached_result(filename, debate_type)
+        if ret is not None:
+            return ret
+
+        xml_file = open_source(filename)
         self.set_parser_for_type(debate_type)
         self.parser.verbose = verbose
+        self.parser.source = source
+        if timings.active():
+            # lookups go through the view of the day as well as the resolver
+            self.parser.resolver = timings.TimedCalls(
+                self.parser.resolver, "resolve", wrap_results=("day",)
+            )
+        self.parser.streaming = (
+            stream and source is None and debate_type in self.streaming_types
+        )
         date = self.parser.get_date(xml_file)
         if date is False:
+            if self.parse_cache is not None:
+                self.parse_cache.add(filename, debate_type, None)
             return "not-present"
 
         if debate_type == "standing":
@@ -1900,43 +2286,80 @@ class ParseDay(object):
 
         tempfilename = tempfile.mktemp(".xml", "pw-filtertemp-", miscfuncs.tmppath)
 
-        parse_ok = self.parse_day(xml_file, debate_type)
+        if self.parser.streaming:
+            out = io.open(tempfilename, mode="w", encoding="utf-8")
+            self.parser.output_stream = out
+        with timings.stage("parse"):
+            parse_ok = self.parse_day(xml_file, debate_type)
 
         if parse_ok:
-            out = io.open(tempfilename, mode="w", encoding="utf-8")
-            self.output(out)
-            out.close()
+            with timings.stage("write"):
+                if not self.parser.streaming:
+                    out = io.open(tempfilename, mode="w", encoding="utf-8")
+                self.output(out)
+                out.close()
         else:
+            if self.parser.streaming:
+                out.close()
             sys.stderr.write("Failed to parse {0}\n".format(filename))
             os.remove(tempfilename)
             return "failed"
 
+        digest = None
+        if self.parse_cache is not None:
+            with timings.stage("digest"):
+                digest = FileDigest.from_file(tempfilename)
+
         # FIME: should be using more temp files here
         # if we have a previous version check if it's different from
         # the new one
         if self.prev_file is not None:
-            diffs = self.compare_xml_files(self.prev_file, tempfilename)
+            with timings.stage("diff"):
+                diffs = self.compare_xml_files(self.prev_file, tempfilename)
             # if they are the same then delete the old one
             if diffs == "SAME":
                 os.remove(tempfilename)
+                self.add_cached_result(filename, debate_type, self.prev_file, digest)
                 return "same"
             # otherwise do the diff and redirect dance
             else:
-                self.rewrite_previous_version(tempfilename)
-                return "change"
+                with timings.stage("diff"):
+                    self.rewrite_previous_version(tempfilename)
+                ret = "change"
         else:
+            folder, ldfile = os.path.split(self.output_file)
+            before = FolderMtime(folder)
             os.rename(tempfilename, self.output_file)
-            return "new"
+            NoteDayFile(folder, ldfile, before)
+            ret = "new"
+        self.add_cached_result(filename, debate_type, self.output_file, digest)
+        return ret
+
+    def get_sitting_key(self, filename, debate_types):
+        # identifies the sitting a file will be written out as, so that
+        # files for different sittings can be parsed independently. Only
+        # the header is read where that is enough, as the file is parsed
+        # in full later on.
+        for debate_type in debate_types:
+            self.reset()
+            with open_source(filename) as xml_file:
+                self.set_parser_for_type(debate_type)
+                if debate_type == "standing":
+                    if self.parser.get_date(xml_file) is False:
+                        continue
+                    self.parser.get_sitting(xml_file)
+                    return self.parser.sitting_id
+                self.parser.streaming = True
+                date = self.parser.get_date(xml_file)
+                if date is not False:
+                    return date
+        return None
 
     def set_parser_for_type(self, debate_type):
         if self.parser is not None:
             return
 
-        parser_types = {
-            "lords": LordsParseDayXML,
-            "standing": PBCParseDayXML,
-        }
-        self.parser = parser_types.get(debate_type, CommonsParseDayXML)()
+        self.parser = self.parser_types.get(debate_type, CommonsParseDayXML)()
         self.parser.debate_type = debate_type
 
     def parse_day(self, text, debate_type):
@@ -1,7 +1,7 @@
 import datetime
 import re
 
-from base_resolver import ResolverBase
+from base_resolver import DateIndex, LazyResolver, ResolverBase, date_ordinal
 from contextexception import ContextException
 
 
@@ -42,13 +42,12 @@ class MemberList(ResolverBase):
             date = datetime.date.today().isoformat()
         if date:
             fro = to = date
-        if not fro:
-            fro = "1000-01-01"
-        if not to:
-            to = "9999-12-31"
+        fro = date_ordinal(fro)
+        to = date_ordinal(to, True)
         ids = []
-        for m in self.members.values():
-            if "start_date" in m and to >= m["start_date"] and fro <= m["end_date"]:
+        members = self.all_members()
+        for m, (start, end) in zip(members, members.spans()):
+            if "start_date" in m and to >= start and fro <= end:
                 ids.append(self.membertoperson(m["id"]))
         return ids
 
@@ -76,17 +75,16 @@ class MemberList(ResolverBase):
         if text == "McFall":
             return ["uk.org.publicwhip/member/384"]
 
-        # Find unique identifier for member
-        ids = set()
-        matches = []
-        matches.extend(self.fullnames.get(text, []))
-        if not matches and titletotal > 0:
-            matches = self.lastnames.get(text, None)
+        # Find unique identifier for member, from each of the indexes the
+        # name is in
+        indexes = [self.fullnames.get(text, DateIndex())]
+        if not indexes[0] and titletotal > 0:
+            indexes = [self.lastnames.get(text, DateIndex())]
 
         # If a speaker, then match against the special speaker parties
         if text == "Speaker" or text == "The Speaker":
-            matches.extend(self.parties.get("Speaker", []))
-        if not matches and text in (
+            indexes.append(self.parties.get("Speaker", DateIndex()))
+        if not any(indexes) and text in (
             "Deputy Speaker",
             "Madam Deputy Speaker",
             "The Deputy Speaker",
@@ -99,12 +97,10 @@ class MemberList(ResolverBase):
                 )
             return self.fullnametoids(self.deputy_speaker, date)
 
-        if matches:
-            for m in matches:
-                if (date == None) or (
-                    date >= m["start_date"] and date <= m["end_date"]
-                ):
-                    ids.add(m["id"])
+        ids = set()
+        for index in indexes:
+            for m in index.on(date):
+                ids.add(m["id"])
         return ids
 
     def setDeputy(self, deputy):
@@ -178,7 +174,7 @@ class MemberList(ResolverBase):
         elif len(ids) > 1:
             names = ""
             for id in ids:
-                name = self.name_on_date(self.membertoperson(id), date)
+                name = self.day(date).name(self.membertoperson(id))
                 names += "%s %s (%s) " % (id, name, self.members[id]["constituency"])
             raise ContextException(
                 "Multiple matches %s, possibles are %s" % (input, names)
@@ -191,7 +187,7 @@ class MemberList(ResolverBase):
         for id in ids:
             pass
         person_id = self.membertoperson(id)
-        remadename = self.name_on_date(person_id, date)
+        remadename = self.day(date).name(person_id)
         if self.members[id]["party"] == "Speaker" and re.search("Speaker", input):
             remadename = input
         return person_id, 'person_id="%s" speakername="%s"%s' % (
@@ -208,4 +204,4 @@ class MemberList(ResolverBase):
         return self.members[memberid]
 
 
-memberList = MemberList()
+memberList = LazyResolver(MemberList)
@@ -0,0 +1,149 @@
+# vim:sw=8:ts=8:et:nowrap
+
+import os
+import re
+
+# Applies the patches made by patchtool.py, which are unified diffs of a
+# single file, to the contents of the file without running patch(1). Hunks
+# have to match exactly, though they can be found away from the line they
+# say they're at, as patch does. Anything else raises PatchError, so the
+# caller can fall back to patch itself, which can also apply with fuzz.
+
+
+class PatchError(Exception):
+    pass
+
+
+hunkheader = re.compile(rb"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# patch filename --> (modification time, hunks), so a patch file is only
+# read and parsed again if it has changed
+hunkcache = {}
+
+
+# lines with their newlines, as patch sees them
+def SplitLines(data):
+    lines = data.split(b"\n")
+    res = [line + b"\n" for line in lines[:-1]]
+    if lines[-1]:
+        res.append(lines[-1])
+    return res
+
+
+# returns (line in the old file the hunk starts at, old lines, new lines,
+# lines of context before and after the changes) for each hunk of the patch
+def ParseHunks(patch):
+    lines = SplitLines(patch)
+    hunks = []
+    i = 0
+    while i < len(lines):
+        mhead = hunkheader.match(lines[i])
+        i += 1
+        if not mhead:
+            continue  # the --- and +++ lines, or anything else around hunks
+        oldstart = int(mhead.group(1))
+        oldlen = int(mhead.group(2) or 1)
+        newlen = int(mhead.group(4) or 1)
+
+        old = []
+        new = []
+        tags = []
+        last = None
+        while i < len(lines) and (
+            len(old) < oldlen or len(new) < newlen or lines[i].startswith(b"\\")
+        ):
+            line = lines[i]
+            tag, body = line[:1], line[1:]
+            i += 1
+            if tag == b"\\":
+                # "\ No newline at end of file", for the line before
+                if last in (b" ", b"-"):
+                    old[-1] = old[-1].rstrip(b"\n")
+                if last in (b" ", b"+"):
+                    new[-1] = new[-1].rstrip(b"\n")
+                continue
+            if tag == b" ":
+                old.append(body)
+                new.append(body)
+            elif tag == b"-":
+                old.append(body)
+            elif tag == b"+":
+                new.append(body)
+            else:
+                raise PatchError("bad line in hunk: %r" % line)
+            tags.append(tag)
+            last = tag
+
+        if len(old) != oldlen or len(new) != newlen:
+            raise PatchError("hunk at line %d is cut short" % oldstart)
+
+        changes = [n for n, tag in enumerate(tags) if tag != b" "]
+        prefix = changes[0] if changes else len(tags)
+        suffix = len(tags) - 1 - changes[-1] if changes else len(tags)
+
+        # a hunk that only adds lines gives the line it adds them after
+        if oldlen:
+            oldstart -= 1
+        hunks.append((oldstart, old, new, prefix, suffix))
+    return hunks
+
+
+# where the old lines of a hunk are, looking outwards from where it should
+# be. As with patch, a hunk with less context before the changes than after
+# is at the start of the file, and one with less after is at the end.
+def FindHunk(lines, old, at, lo, prefix, suffix, oldstart):
+    hi = len(lines) - len(old)
+    if prefix < suffix and oldstart == 0:
+        positions = [0]
+    elif suffix < prefix:
+        positions = [hi]
+    else:
+        positions = []
+        for distance in range(max(at - lo, hi - at) + 1):
+            positions.extend((at + distance, at - distance))
+    for pos in positions:
+        if lo <= pos <= hi and lines[pos : pos + len(old)] == old:
+            return pos
+    return None
+
+
+def ApplyHunks(data, hunks):
+    lines = SplitLines(data)
+    res = []
+    done = 0  # lines of the old file dealt with
+    offset = 0  # how far hunks have been from where they said they'd be
+    for oldstart, old, new, prefix, suffix in hunks:
+        pos = FindHunk(lines, old, oldstart + offset, done, prefix, suffix, oldstart)
+        if pos is None:
+            raise PatchError("hunk at line %d does not apply" % (oldstart + 1))
+        res.extend(lines[done:pos])
+        res.extend(new)
+        done = pos + len(old)
+        offset = pos - oldstart
+    res.extend(lines[done:])
+    # a line that had no newline at the end of the file needs one if it
+    # isn't at the end any more
+    for n in range(len(res) - 1):
+        if not res[n].endswith(b"\n"):
+            res[n] += b"\n"
+    return b"".join(res)
+
+
+def ApplyPatch(data, patch):
+    return ApplyHunks(data, ParseHunks(patch))
+
+
+def PatchFileHunks(patchfile):
+    mtime = os.stat(patchfile).st_mtime_ns
+    cached = hunkcache.get(patchfile)
+    if cached is None or cached[0] != mtime:
+        with open(patchfile, "rb") as f:
+            cached = (mtime, ParseHunks(f.read()))
+        hunkcache[patchfile] = cached
+    return cached[1]
+
+
+def ApplyPatchFile(filein, patchfile):
+    with open(filein, "rb") as f:
+        data = f.read()
+    return ApplyHunks(data, PatchFileHunks(patchfile))
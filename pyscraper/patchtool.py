@@ -13,10 +13,14 @@ import miscfuncs
 # change current directory to pyscraper folder script is in
 os.chdir(os.path.dirname(sys.argv[0]) or ".")
 
+from patchfilter import ApplyPatchFile, PatchError
 from resolvemembernames import memberList
 
 toppath = miscfuncs.toppath
 
+# patch directories known to exist, so they're only checked for once
+patchdirs = set()
+
 
 # File names of patch files
 # this is horid since it shadows stuff that's done distributively in the scrapers
@@ -51,8 +55,10 @@ def GenPatchFileNames(typ, sdate):
     # if typ != "lordspages":
     # pdire = "patches"  # as local directory
     pdire = os.path.join(pdire, typ)
-    if not os.path.isdir(pdire):
-        os.mkdir(pdire)
+    if pdire not in patchdirs:
+        if not os.path.isdir(pdire):
+            os.mkdir(pdire)
+        patchdirs.add(pdire)
 
     patchfile = os.path.join(pdire, "%s%s.%s.patch" % (stub, sdate, extension))
     orgfile = os.path.join(folder, "%s%s.%s" % (stub, sdate, extension))
@@ -72,7 +78,12 @@ def RunPatchToolW(typ, sdate, stamp, frag):
     shutil.copyfile(orgfile, tmpfile)
     if os.path.isfile(patchfile):
         print("Patching ", patchfile)
-        status = os.system('patch --quiet "%s" < "%s"' % (tmpfile, patchfile))
+        try:
+            data = ApplyPatchFile(orgfile, patchfile)
+            with open(tmpfile, "wb") as f:
+                f.write(data)
+        except PatchError:
+            status = os.system('patch --quiet "%s" < "%s"' % (tmpfile, patchfile))
 
     # run the editor (first finding the line number to be edited)
     gp = 0
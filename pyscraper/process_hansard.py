@@ -3,12 +3,21 @@
 
 import argparse
 import datetime
+import multiprocessing
 import os
 import re
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import groupby
 from os.path import join
 
+import timings
+from hansardzips import add_zip, zip_path
 from miscfuncs import toppath
-from new_hansard import ParseDay
+from new_hansard import ParseCache, ParseDay, load_resolvers
 
 today = datetime.date.today()
 yesterday = today - datetime.timedelta(2)  # Not actually yesterday
@@ -21,45 +30,118 @@ parser.add_argument(
     "--to", dest="date_to", default=today.isoformat(), metavar="YYYY-MM-DD"
 )
 parser.add_argument("-v", "--verbose", action="count", default=0)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="number of processes to parse with, each handling whole sittings",
+)
+parser.add_argument(
+    "--stream",
+    action="store_true",
+    help="read and write Commons files a piece at a time, to save memory",
+)
+parser.add_argument(
+    "--reparse",
+    action="store_true",
+    help="parse files even if the same ones have given the latest output before",
+)
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="profile parsing, keeping the output for the slowest files in "
+    "parldata/profiles/process_hansard",
+)
 ARGS = parser.parse_args()
 
-index_filename = join(toppath, "seen_hansard_xml.txt")
+index_filename = join(toppath, "seen_hansard_xml.sqlite")
+parse_cache_filename = join(toppath, "parsed_hansard_xml.sqlite")
+old_index_filename = join(toppath, "seen_hansard_xml.txt")
 zip_directory = join(toppath, "cmpages", "hansardzips")
 zip_dir_slash = "%s/" % zip_directory
+profile_directory = join(toppath, "profiles", "process_hansard")
 
 
+# each entry from the feed is either unpacked into a directory, or a zip
+# which is read from directly
 dir_match = "\d+_((\d{4}-\d{2}-\d{2})_\d{2}:\d{2}:\d{2})$"
 dirs = []
 for d in os.listdir(zip_directory):
-    m = re.match(dir_match, d)
+    m = re.match(dir_match, zip_path(d))
     fn = join(zip_directory, d)
-    if m and os.path.isdir(fn) and ARGS.date_from <= m.group(2) <= ARGS.date_to:
+    if not m or not ARGS.date_from <= m.group(2) <= ARGS.date_to:
+        continue
+    if os.path.isdir(fn) or (d.endswith(".zip") and not os.path.isdir(zip_path(fn))):
         dirs.append(fn)
 
 # process the directories in date order so we do any revisions in the correct
 # order
-dirs.sort(key=lambda x: re.match(".*/%s" % dir_match, x).group(1))
+dirs.sort(key=lambda x: re.match(".*/%s" % dir_match, zip_path(x)).group(1))
+
+
+# make sure we only look at a file once. Each file is recorded as soon as
+# it has been parsed, along with how it went, so nothing is lost if we crash
+class SeenFiles(object):
+    def __init__(self, filename):
+        self.db = sqlite3.connect(filename)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS seen (
+                key TEXT PRIMARY KEY,
+                outcome TEXT,
+                seconds REAL,
+                output_file TEXT,
+                parsed_at TEXT
+            )"""
+        )
+        if self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0] == 0:
+            self.import_text(old_index_filename)
 
+    # bring across the list of keys from the old plain text index
+    def import_text(self, filename):
+        if not os.path.exists(filename):
+            return
+        with open(filename) as f:
+            keys = [e.strip().replace(zip_dir_slash, "") for e in f.readlines()]
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO seen (key) VALUES (?)", ((k,) for k in keys if k)
+            )
 
-# make sure we only look at a file once
-class Entries(list):
-    def __init__(self):
-        entries = []
-        if os.path.exists(index_filename):
-            with open(index_filename) as f:
-                entries = [e.strip().replace(zip_dir_slash, "") for e in f.readlines()]
-        super(Entries, self).__init__(entries)
+    def __contains__(self, key):
+        row = self.db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone()
+        return row is not None
 
-    def dump(self):
-        with open(index_filename, "w") as f:
-            f.writelines("{0}\n".format(entry) for entry in self)
+    def add(self, key, outcome=None, seconds=None, output_file=None):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    outcome,
+                    seconds,
+                    output_file,
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
 
+    def close(self):
+        self.db.close()
 
-entries = Entries()
+
+entries = SeenFiles(index_filename)
+parse_cache = ParseCache(parse_cache_filename)
+parse_cache.lookup = not ARGS.reparse
+profiles = timings.SlowestProfiles(profile_directory) if ARGS.profile else None
 
 
 def find(pattern, path):
     result = []
+    if path.endswith(".zip"):
+        for filename in add_zip(path):
+            if re.search(pattern, os.path.basename(filename)):
+                result.append(filename.replace(zip_dir_slash, ""))
+        return result
     for root, dirs, files in os.walk(path):
         for name in files:
             if re.search(pattern, name):
@@ -67,57 +149,183 @@ def find(pattern, path):
     return result
 
 
-def handle_file(filename, debate_type):
-    file_key = "{0}:{1}".format(debate_type, filename)
-    if file_key in entries:
-        if ARGS.verbose:
-            print("already seen {0}, not parsing again".format(filename))
-        return False
-
+def parse_file(filename, debate_type, report=print, source=None):
     parser.reset()
     if ARGS.verbose:
-        print("looking at {0}".format(filename))
-    ret = parser.handle_file(join(zip_directory, filename), debate_type, ARGS.verbose)
+        report("looking at {0}".format(filename))
+    start = time.time()
+    profile = nullcontext()
+    if profiles is not None:
+        profile = profiles.profile("{0}_{1}".format(filename, debate_type))
+    with timings.timing(filename, debate_type=debate_type) as timer, profile:
+        ret = parser.handle_file(
+            join(zip_directory, filename),
+            debate_type,
+            ARGS.verbose,
+            source,
+            ARGS.stream,
+        )
+        timer.record(outcome=ret)
+    seconds = time.time() - start
+
+    output_file = None
 
     if ret == "failed":
-        print("ERROR parsing {0} {1}".format(filename, debate_type))
+        report("ERROR parsing {0} {1}".format(filename, debate_type))
     elif ret == "not-present":
         if ARGS.verbose:
-            print("Nothing to parse in {0} {1}".format(filename, debate_type))
+            report("Nothing to parse in {0} {1}".format(filename, debate_type))
     elif ret == "same":
-        prev_file = parser.prev_file.replace(toppath, "")
-        print("parsed {0}, no changes from {1}".format(filename, prev_file))
+        output_file = parser.prev_file.replace(toppath, "")
+        report("parsed {0}, no changes from {1}".format(filename, output_file))
     elif ret in ("change", "new"):
         output_file = parser.output_file.replace(toppath, "")
-        print("parsed {0} to {1}".format(filename, output_file))
+        report("parsed {0} to {1}".format(filename, output_file))
     else:
         output_file = parser.output_file.replace(toppath, "")
-        print(
+        report(
             "parsed {0} {1} to {2}, unknown return {3}".format(
                 filename, debate_type, output_file, ret
             )
         )
-    entries.append(file_key)
 
-    return True
+    return ret, seconds, output_file
+
+
+# CHAN files have both debates and Westminster Hall in, so when both are
+# wanted the XML is only parsed once, unless each is being streamed or one
+# isn't going to be parsed at all as it is known to be the same
+def parse_types(filename, debate_types, report=print):
+    source = None
+    if len(debate_types) > 1 and not ARGS.stream:
+        path = join(zip_directory, filename)
+        uncached = [t for t in debate_types if parser.cached_result(path, t) is None]
+        if len(uncached) > 1:
+            source = parser.load_source(path, uncached[0])
+    for debate_type in debate_types:
+        yield debate_type, parse_file(filename, debate_type, report, source)
+
+
+def handle_file(filename, debate_types):
+    todo = []
+    for debate_type in debate_types:
+        file_key = "{0}:{1}".format(debate_type, filename)
+        if file_key in entries:
+            if ARGS.verbose:
+                print("already seen {0}, not parsing again".format(filename))
+        else:
+            todo.append(debate_type)
+
+    for debate_type, result in parse_types(filename, todo):
+        entries.add("{0}:{1}".format(debate_type, filename), *result)
+
+    return len(todo) > 0
+
+
+def file_types(filename):
+    if "CHAN" in filename:
+        return ("debate", "westminhall")
+    elif "LHAN" in filename:
+        return ("lords",)
+    elif "PBC" in filename:
+        return ("standing",)
+    return ()
+
+
+# These run in the worker processes when using --jobs, each of which has
+# its own parser (and so its own resolvers) set up by start_worker
+def start_worker():
+    global parser
+    parser = ParseDay()
+    # a connection of its own, with the versions already worked out
+    parser.parse_cache = ParseCache(
+        parse_cache_filename, parse_cache.code, parse_cache.members
+    )
+    parser.parse_cache.lookup = parse_cache.lookup
+
+
+def get_sitting_key(filename):
+    return parser.get_sitting_key(join(zip_directory, filename), file_types(filename))
+
+
+def parse_unit(files):
+    done = []
+    try:
+        for filename, group in groupby(files, lambda f: f[0]):
+            messages = []
+            debate_types = [debate_type for _, debate_type in group]
+            for debate_type, result in parse_types(
+                filename, debate_types, messages.append
+            ):
+                key = "{0}:{1}".format(debate_type, filename)
+                done.append((key, messages[:], result))
+                del messages[:]
+    except Exception:
+        return done, traceback.format_exc()
+    return done, None
+
+
+def handle_files_parallel(to_parse):
+    todo = []
+    for filename, debate_type in to_parse:
+        file_key = "{0}:{1}".format(debate_type, filename)
+        if file_key in entries:
+            if ARGS.verbose:
+                print("already seen {0}, not parsing again".format(filename))
+        else:
+            todo.append((filename, debate_type))
+
+    # Every revision of a sitting is written to the same set of output
+    # files, so each sitting is a unit of work handled by one process, in
+    # the order the zips were published. Different sittings can't affect
+    # each other's output so can be done at the same time. The debates and
+    # Westminster Hall for a day go in the same unit, so each CHAN file
+    # is keyed, and parsed, only once.
+    if todo:
+        load_resolvers()
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(
+        max_workers=ARGS.jobs, mp_context=context, initializer=start_worker
+    ) as pool:
+        filenames = list(dict.fromkeys(f for f, _ in todo))
+        keys = dict(zip(filenames, pool.map(get_sitting_key, filenames, chunksize=8)))
+        units = {}
+        for filename, debate_type in todo:
+            # files with nothing in them don't write anything
+            key = keys[filename]
+            if key is None:
+                key = filename
+            units.setdefault((file_types(filename), key), []).append(
+                (filename, debate_type)
+            )
+
+        futures = [pool.submit(parse_unit, files) for files in units.values()]
+        for future in futures:
+            done, error = future.result()
+            for file_key, messages, result in done:
+                for message in messages:
+                    print(message)
+                entries.add(file_key, *result)
+            if error:
+                pool.shutdown(cancel_futures=True)
+                raise Exception("Error parsing in worker process:\n" + error)
 
 
 parser = ParseDay()
+parser.parse_cache = parse_cache
 try:
+    to_parse = []
     for d in dirs:
         xml_files = find("([CL]HAN|PBC).*\.xml$", d)
         for x in xml_files:
-            if "CHAN" in x:
-                handle_file(x, "debate")
-                handle_file(x, "westminhall")
-            elif "LHAN" in x:
-                handle_file(x, "lords")
-            elif "PBC" in x:
-                handle_file(x, "standing")
-
-# this is just to make sure we record progress
-except Exception:
-    entries.dump()
-    raise
-
-entries.dump()
+            for debate_type in file_types(x):
+                to_parse.append((x, debate_type))
+
+    if ARGS.jobs > 1:
+        handle_files_parallel(to_parse)
+    else:
+        for x, group in groupby(to_parse, lambda f: f[0]):
+            handle_file(x, [debate_type for _, debate_type in group])
+finally:
+    entries.close()
+    parse_cache.close()
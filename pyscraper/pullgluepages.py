@@ -9,21 +9,26 @@ pwcmdirs = miscfuncs.pwcmdirs
 
 from miscfuncs import AlphaStringToOrder, NextAlphaString
 
+# Scans of output directories are kept between calls, keyed on the folder
+# and file pattern, and redone when the directory's mtime changes. Files we
+# write ourselves are added with NoteDayFile so that doesn't force a rescan.
+daymapcache = {}
 
-def MakeDayMap(folder, typ, basedir=pwcmdirs, extension="html"):
-    # make the output directory
-    if not os.path.isdir(basedir):
-        os.mkdir(basedir)
-    pwcmfolder = os.path.join(basedir, folder)
-    if not os.path.isdir(pwcmfolder):
-        os.mkdir(pwcmfolder)
 
-    # the following is code copied from the lordspullgluepages
+def FolderMtime(pwcmfolder):
+    return os.stat(pwcmfolder).st_mtime_ns
+
+
+def ScanDayDir(pwcmfolder, pattern):
+    mtime = FolderMtime(pwcmfolder)
+    cached = daymapcache.get((pwcmfolder, pattern))
+    if cached and cached[0] == mtime:
+        return cached[1]
 
     # scan through the directory and make a mapping of all the copies for each
     lddaymap = {}
     for ldfile in os.listdir(pwcmfolder):
-        mnums = re.match("%s(\d{4}-\d\d-\d\d)([a-z]*)\.%s$" % (typ, extension), ldfile)
+        mnums = re.match(pattern, ldfile)
         if mnums:
             sdate = mnums.group(1)
             salpha = mnums.group(2)
@@ -35,7 +40,38 @@ def MakeDayMap(folder, typ, basedir=pwcmdirs, extension="html"):
         elif os.path.isfile(os.path.join(pwcmfolder, ldfile)):
             print("not recognized file:", ldfile, " in ", pwcmfolder)
 
-    return lddaymap, pwcmfolder
+    daymapcache[(pwcmfolder, pattern)] = (mtime, lddaymap)
+    return lddaymap
+
+
+# before is the folder's mtime from before the file was written. A scan is
+# only moved on to the new mtime if it was made at that one, as otherwise
+# something else has changed the folder since, so it is left to be redone.
+def NoteDayFile(pwcmfolder, ldfile, before):
+    mtime = FolderMtime(pwcmfolder)
+    for (folder, pattern), (oldmtime, lddaymap) in list(daymapcache.items()):
+        if folder != pwcmfolder or oldmtime != before:
+            continue
+        mnums = re.match(pattern, ldfile)
+        if mnums:
+            versions = lddaymap.setdefault(mnums.group(1), [])
+            entry = (AlphaStringToOrder(mnums.group(2)), mnums.group(2), ldfile)
+            if entry not in versions:
+                versions.append(entry)
+        daymapcache[(folder, pattern)] = (mtime, lddaymap)
+
+
+def MakeDayMap(folder, typ, basedir=pwcmdirs, extension="html"):
+    # make the output directory
+    if not os.path.isdir(basedir):
+        os.mkdir(basedir)
+    pwcmfolder = os.path.join(basedir, folder)
+    if not os.path.isdir(pwcmfolder):
+        os.mkdir(pwcmfolder)
+
+    # the following is code copied from the lordspullgluepages
+    pattern = "%s(\d{4}-\d\d-\d\d)([a-z]*)\.%s$" % (typ, extension)
+    return ScanDayDir(pwcmfolder, pattern), pwcmfolder
 
 
 def GetFileDayVersions(day, lddaymap, pwcmfolder, typ, extension="html"):
@@ -1,13 +1,11 @@
 import datetime
 from dataclasses import dataclass
-from functools import lru_cache as lrucache
 from itertools import groupby
 from pathlib import Path
 from typing import Any, Literal, Optional
 
 import requests
 import rich
-from mysoc_validator import Popolo
 from mysoc_validator.models.consts import Chamber
 from mysoc_validator.models.interests import (
     RegmemAnnotation,
@@ -29,7 +27,7 @@ from pyscraper.regmem.commons.api_models import (
     CommonsAPIPublishedInterest,
     CommonsAPIPublishedRegister,
 )
-from pyscraper.regmem.funcs import memberdata_path, nice_name, parldata_path
+from pyscraper.regmem.funcs import get_popolo, nice_name, parldata_path
 from pyscraper.regmem.legacy_converter import (
     convert_legacy_to_register,
     write_register_to_xml,
@@ -49,11 +47,6 @@ def slugify(s: str) -> str:
     return s.lower().replace(" ", "_")
 
 
-@lrucache
-def get_popolo() -> Popolo:
-    return Popolo.from_path(memberdata_path / "people.json")
-
-
 def recursive_fetch(
     url: str,
     params: Optional[dict[str, Any]] = None,
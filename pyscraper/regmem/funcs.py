@@ -1,12 +1,18 @@
+import os
 import re
+import sys
 from datetime import date
-from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 from mysoc_validator import Popolo
 from pydantic import BaseModel, RootModel
 
+# imported the same way as by the parsers, so there is only the one copy of
+# the module and of the people.json it has loaded
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from base_resolver import get_popolo as get_shared_popolo
+
 
 def nice_name(name: Optional[str]) -> str:
     """
@@ -43,9 +49,8 @@ parldata_path = get_higher_path("parldata")
 memberdata_path = get_higher_path("members")
 
 
-@lru_cache
 def get_popolo() -> Popolo:
-    return Popolo.from_path(memberdata_path / "people.json")
+    return get_shared_popolo(memberdata_path / "people.json")
 
 
 class RegmemIndexEntry(BaseModel):
@@ -7,7 +7,7 @@ import json
 import os
 import re
 
-from base_resolver import ResolverBase
+from base_resolver import Alias, DateIndex, LazyResolver, ResolverBase, overlap
 from contextexception import ContextException
 from parlphrases import parlPhrases
 
@@ -82,14 +82,13 @@ class MemberList(ResolverBase):
                 for id in ids:
                     m = self.members[id]
                     # add ones which overlap the membership dates to the alias
-                    newattr = {"id": m["id"], "person_id": m["person_id"]}
-                    early = max(m["start_date"], mship.get("start_date", "1000-01-01"))
-                    late = min(m["end_date"], mship.get("end_date", "9999-12-31"))
+                    span = overlap(m, mship)
                     # sometimes the ranges don't overlap
-                    if early <= late:
-                        newattr["start_date"] = early
-                        newattr["end_date"] = late
-                        self.fullnames.setdefault(mship["role"], []).append(newattr)
+                    if span:
+                        newattr = Alias(m["id"], m["person_id"], *span)
+                        self.fullnames.setdefault(mship["role"], DateIndex()).append(
+                            newattr
+                        )
                         # print mship["role"], early, late, mship['name']
 
     def currentmpslist(self):
@@ -97,14 +96,13 @@ class MemberList(ResolverBase):
         return self.mpslistondate(today)
 
     def mpslistondate(self, date):
-        ids = []
-        for m in self.members.values():
-            if date >= m["start_date"] and date <= m["end_date"]:
-                ids.append(m)
-        return ids
+        return self.members_on(date)
 
     # useful to have this function out there
     def striptitles(self, text):
+        return self.lookup_cache.fetch(("striptitles", text), self._striptitles, text)
+
+    def _striptitles(self, text):
         # Remove dots, but leave a space between them
         text = text.replace(".", " ")
         text = text.replace(",", " ")
@@ -131,6 +129,12 @@ class MemberList(ResolverBase):
 
     # date can be none, will give more matches
     def fullnametoids(self, tinput, date):
+        ids = self.lookup_cache.fetch(
+            ("fullnametoids", tinput, date), self._fullnametoids, tinput, date
+        )
+        return set(ids)
+
+    def _fullnametoids(self, tinput, date):
         text, titletotal = self.striptitles(tinput)
 
         # Find unique identifier for member
@@ -150,19 +154,14 @@ class MemberList(ResolverBase):
             matches = self.parties.get("Deputy Speaker", None)
 
         if matches:
-            for attr in matches:
-                if (date == None) or (
-                    date >= attr["start_date"] and date <= attr["end_date"]
-                ):
-                    ids.add(attr["id"])
-                # Special case Mr MacDougall questions answered after he died
-                if (
-                    attr["id"] == "uk.org.publicwhip/member/1992"
-                    and date >= "2008-09-01"
-                    and date <= "2008-09-30"
-                ):
-                    ids.add(attr["id"])
-        return ids
+            for attr in matches.on(date):
+                ids.add(attr["id"])
+            # Special case Mr MacDougall questions answered after he died
+            if date and "2008-09-01" <= date <= "2008-09-30":
+                for attr in matches:
+                    if attr["id"] == "uk.org.publicwhip/member/1992":
+                        ids.add(attr["id"])
+        return frozenset(ids)
 
     # Returns id, name, corrected constituency
     # Returns id, corrected name, corrected constituency
@@ -298,17 +297,14 @@ class MemberList(ResolverBase):
         self.debatenamehistory = []
         self.debateofficehistory = {}
 
-    # Matches names - exclusively for debates pages
-    def matchdebatename(self, input, bracket, date, typ):
+    # The part of matchdebatename that only depends on the text and date, so
+    # can be cached. Returns the cleaned up name and bracket, the office
+    # attribute if the bracket was a name, and the possible ids before the
+    # day's history is used to choose between them.
+    def debatenametoids(self, input, bracket, date):
         speakeroffice = ""
         input = self.basicsubs(input)
 
-        # Clear name history if date change
-        self.date_setup(date)
-
-        if input == "The Queen":
-            return 'person_id="uk.org.publicwhip/person/13935" speakername="The Queen"'
-
         # Sometimes no bracketed component: Mr. Prisk
         ids = self.fullnametoids(input, date)
         # Different types of brackets...
@@ -332,6 +328,24 @@ class MemberList(ResolverBase):
             # Sometimes constituency in brackets: Malcolm Bruce (Gordon)
             ids = self.intersect_constituency(bracket, ids, date)
 
+        return input, bracket, speakeroffice, frozenset(ids)
+
+    # Matches names - exclusively for debates pages
+    def matchdebatename(self, input, bracket, date, typ):
+        # Clear name history if date change
+        self.date_setup(date)
+
+        input, bracket, speakeroffice, ids = self.lookup_cache.fetch(
+            ("debatenametoids", input, bracket, date),
+            self.debatenametoids,
+            input,
+            bracket,
+            date,
+        )
+
+        if input == "The Queen":
+            return 'person_id="uk.org.publicwhip/person/13935" speakername="The Queen"'
+
         # If ambiguous (either form "Mr. O'Brien" or full name, ambiguous due
         # to missing constituency) look in recent name match history
         if len(ids) > 1:
@@ -480,22 +494,18 @@ class MemberList(ResolverBase):
         consids = self.constoidmap.get(text, None)
         if consids:
             # Search for constituency matches, and intersect results with them
+            # (without a date, only if allow_empty_date, when any will do)
             newids = set()
-            for cons in consids:
-                if (allow_empty_date and date is None) or (
-                    cons["start_date"] <= date and date <= cons["end_date"]
-                ):
+            if date is not None or allow_empty_date:
+                for cons in consids.on(date):
                     consid = cons["id"]
                     # get any mps
                     matches = self.considtomembermap.get(consid, None)
 
                     if matches:
-                        for m in matches:
-                            if (allow_empty_date and date is None) or (
-                                date >= m["start_date"] and date <= m["end_date"]
-                            ):
-                                if m["id"] in ids:
-                                    newids.add(m["id"])
+                        for m in matches.on(date):
+                            if m["id"] in ids:
+                                newids.add(m["id"])
             ids = newids
 
         return ids
@@ -698,14 +708,13 @@ class MemberList(ResolverBase):
         if not consids:
             raise Exception("Unknown constituency %s" % cons)
         consid = None
-        for consattr in consids:
-            if consattr["start_date"] <= date and date <= consattr["end_date"]:
-                if consid:
-                    raise Exception(
-                        "Two like-named constituency ids %s %s overlap with date %s"
-                        % (consid, consattr["id"], date)
-                    )
-                consid = consattr["id"]
+        for consattr in consids.on(date):
+            if consid:
+                raise Exception(
+                    "Two like-named constituency ids %s %s overlap with date %s"
+                    % (consid, consattr["id"], date)
+                )
+            consid = consattr["id"]
         if consid not in self.considtonamemap:
             raise Exception(
                 "Not known name of consid %s cons %s date %s" % (consid, cons, date)
@@ -760,21 +769,7 @@ class MemberList(ResolverBase):
 
     # Historic ID -> ID
     def matchhistoric(self, hansard_id, date):
-        ids = []
-        for attr in self.historichansard[hansard_id]:
-            attr_start_date = (
-                len(attr["start_date"]) == 4
-                and ("%s-01-01" % attr["start_date"])
-                or attr["start_date"]
-            )
-            attr_end_date = (
-                len(attr["end_date"]) == 4
-                and ("%s-12-31" % attr["end_date"])
-                or attr["end_date"]
-            )
-            # print hansard_id, attr_start_date, date, attr_end_date
-            if attr_start_date <= date and date <= attr_end_date:
-                ids.append(attr["id"])
+        ids = [attr["id"] for attr in self.historichansard[hansard_id].on(date)]
 
         if len(ids) == 0:
             raise Exception(
@@ -789,4 +784,4 @@ class MemberList(ResolverBase):
 
 
 # Construct the global singleton of class which people will actually use
-memberList = MemberList()
+memberList = LazyResolver(MemberList)
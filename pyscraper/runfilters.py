@@ -1,19 +1,29 @@
 # vim:sw=8:ts=8:et:nowrap
 
+import copy
+import datetime
+import hashlib
+import io
+import multiprocessing
 import os
 import re
 import shutil
+import sqlite3
 import sys
 import tempfile
 import time
 import xml.sax
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 
 xmlvalidate = xml.sax.make_parser()
 
 import miscfuncs
+import timings
 from contextexception import ContextException
 from miscfuncs import AlphaStringToOrder
 from ni.parse import ParseDay as ParseNIDay
+from patchfilter import ApplyPatchFile, PatchError
 from patchtool import RunPatchTool
 
 toppath = miscfuncs.toppath
@@ -27,7 +37,8 @@ pwpatchesdirs = miscfuncs.pwpatchesdirs
 # outgoing directory of scaped pages directories
 # file to store list of newly done dates
 changedatesfile = "changedates.txt"
-tempfilename = tempfile.mktemp(".xml", "pw-filtertemp-", miscfuncs.tmppath)
+# what each input file was when it was last parsed
+manifestfile = os.path.join(toppath, "parsed_filters.sqlite")
 
 # create the output directory
 if not os.path.isdir(pwxmldirs):
@@ -45,38 +56,59 @@ def ApplyPatches(filein, fileout, patchfile):
     assert False
 
 
+# the text of a file with its patch applied. The patch is applied here if
+# it can be, otherwise by running patch on a copy of the file
+def ReadPatchedFile(jfin, patchfile):
+    if not os.path.isfile(patchfile):
+        with open(jfin) as ofin:
+            return ofin.read()
+
+    try:
+        data = ApplyPatchFile(jfin, patchfile)
+    except PatchError as e:
+        print("patching %s in place failed (%s), running patch" % (jfin, e))
+        patchtempfilename = tempfile.mktemp("", "pw-applypatchtemp-", miscfuncs.tmppath)
+        ApplyPatches(jfin, patchtempfilename, patchfile)
+        with open(patchtempfilename) as ofin:
+            text = ofin.read()
+        os.remove(patchtempfilename)
+        return text
+    # decoded the same way as reading the file would
+    return io.TextIOWrapper(io.BytesIO(data)).read()
+
+
 # the operation on a single file
 def RunFilterFile(
     FILTERfunction, xprev, sdate, sdatever, dname, jfin, patchfile, jfout, bquietc
 ):
-    # now apply patches and parse
-    patchtempfilename = tempfile.mktemp("", "pw-applypatchtemp-", miscfuncs.tmppath)
-
     if not bquietc:
         print("reading " + jfin)
 
-    # apply patch filter
-    kfin = jfin
-    if os.path.isfile(patchfile) and ApplyPatches(jfin, patchtempfilename, patchfile):
-        kfin = patchtempfilename
+    # apply patch filter, and read the text of the file
+    with timings.stage("patch"):
+        text = ReadPatchedFile(jfin, patchfile)
 
-    # read the text of the file
-    ofin = open(kfin)
-    text = ofin.read()
-    ofin.close()
+    # one for each file, as files can be parsed in several processes at once
+    tempfilename = tempfile.mktemp(".xml", "pw-filtertemp-", miscfuncs.tmppath)
 
     # do the filtering according to the type.  Some stuff is being inlined here
     if dname == "regmem" or dname == "ni":
         regmemout = open(tempfilename, "w")
         try:
-            FILTERfunction(
-                regmemout, text, sdate, sdatever
-            )  # totally different filter function format
+            with timings.stage("parse"):
+                FILTERfunction(
+                    regmemout, text, sdate, sdatever
+                )  # totally different filter function format
+        except Exception:
+            regmemout.close()
+            os.remove(tempfilename)
+            raise
         finally:
             regmemout.close()
         # in win32 this function leaves the file open and stops it being renamed
         if sys.platform != "win32":
-            xmlvalidate.parse(tempfilename)  # validate XML before renaming
+            with timings.stage("validate"):
+                xmlvalidate.parse(tempfilename)  # validate XML before renaming
         if os.path.isfile(jfout):
             os.remove(jfout)
         os.rename(tempfilename, jfout)
@@ -91,14 +123,159 @@ def findpatchfile(name, d1, d2):
     return patchfile
 
 
+# Records what each input file and its patch were when it was last parsed,
+# so files can be skipped if neither has changed since. Inputs are only
+# read again to check if their size or modification time has changed.
+class FilterManifest(object):
+    def __init__(self, filename):
+        self.db = sqlite3.connect(filename)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS parsed (
+                dname TEXT,
+                name TEXT,
+                size INTEGER,
+                mtime INTEGER,
+                input TEXT,
+                patch TEXT,
+                parsed_at TEXT,
+                PRIMARY KEY (dname, name)
+            )"""
+        )
+
+    def file_digest(self, filename):
+        if not os.path.isfile(filename):
+            return None
+        with open(filename, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def get(self, dname, name):
+        return self.db.execute(
+            "SELECT size, mtime, input, patch FROM parsed WHERE dname = ? AND name = ?",
+            (dname, name),
+        ).fetchone()
+
+    def input_digest(self, row, jfin):
+        st = os.stat(jfin)
+        if row is not None and row[:2] == (st.st_size, st.st_mtime_ns):
+            return row[2]
+        return self.file_digest(jfin)
+
+    # whether a file is the same as when it was last parsed. Files parsed
+    # before there was a manifest are compared by modification time instead
+    def unchanged(self, dname, name, jfin, patchfile, jfout):
+        if not os.path.isfile(jfout):
+            return False
+        row = self.get(dname, name)
+        if row is None:
+            out_modified = os.stat(jfout).st_mtime
+            if os.stat(jfin).st_mtime > out_modified:
+                return False
+            if os.path.isfile(patchfile) and os.stat(patchfile).st_mtime > out_modified:
+                return False
+            self.add(dname, name, jfin, patchfile)
+            return True
+        return (
+            self.input_digest(row, jfin) == row[2]
+            and self.file_digest(patchfile) == row[3]
+        )
+
+    def add(self, dname, name, jfin, patchfile):
+        st = os.stat(jfin)
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO parsed VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    dname,
+                    name,
+                    st.st_size,
+                    st.st_mtime_ns,
+                    self.file_digest(jfin),
+                    self.file_digest(patchfile),
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+
+    def close(self):
+        self.db.close()
+
+
+# the profiles kept by a worker process when parsing with --jobs. Each
+# worker keeps the slowest of all the files it parses, rather than getting
+# a new copy with the options for every day and so keeping every file.
+workerprofiles = None
+
+
+def StartWorker(profiles):
+    global workerprofiles
+    workerprofiles = profiles
+
+
+# parses the files of a day, in order, until one fails. Returns the names
+# of the files parsed, and the ContextException it stopped at, if any. This
+# is what runs in the worker processes when parsing with --jobs.
+def RunFiltersDay(FILTERfunction, dname, sdate, dayfiles, options):
+    profiles = options.profiles
+    if workerprofiles is not None:
+        profiles = workerprofiles
+    parsed = []
+    xprev = None  # previous xml file from which we check against diffs, and its version string
+    for fin, jfin, jfout, patchfile, sdatever, bparsefile in dayfiles:
+        while bparsefile:  # flag is being used acually as if bparsefile: while True:
+            profile = nullcontext()
+            if profiles is not None:
+                profile = profiles.profile(fin)
+            try:
+                with timings.timing(fin, section=dname) as timer, profile:
+                    try:
+                        RunFilterFile(
+                            FILTERfunction,
+                            xprev,
+                            sdate,
+                            sdatever,
+                            dname,
+                            jfin,
+                            patchfile,
+                            jfout,
+                            options.quietc,
+                        )
+                    except ContextException:
+                        timer.record(outcome="failed")
+                        raise
+                    timer.record(outcome="parsed")
+                parsed.append(fin)
+                break
+
+            # exception cases which cause the loop to continue
+            except ContextException as ce:
+                if options.patchtool:
+                    # deliberately don't set options.anyerrors (as they are to fix it!)
+                    print("runfilters.py", ce)
+                    RunPatchTool(dname, (sdate + sdatever), ce)
+                    # find file again, in case new
+                    patchfile = findpatchfile(fin, *PatchDirs(dname))
+                    continue  # emphasise that this is the repeat condition
+                return parsed, ce
+
+        # endwhile
+        xprev = (jfout, sdatever)
+    return parsed, None
+
+
+# where the patches for a type are, in the order they're looked for
+def PatchDirs(dname):
+    # migrating to patches files stored in parldata, rather than in parlparse
+    return (
+        os.path.join(toppath, "patches", dname),
+        os.path.join(pwpatchesdirs, dname),
+    )
+
+
 # this works on triplets of directories all called dname
 def RunFiltersDir(FILTERfunction, dname, options, forcereparse):
     # the in and out directories for the type
     pwcmdirin = os.path.join(pwcmdirs, dname)
     pwxmldirout = os.path.join(pwxmldirs, dname)
-    # migrating to patches files stored in parldata, rather than in parlparse
-    pwpatchesdir = os.path.join(pwpatchesdirs, dname)
-    newpwpatchesdir = os.path.join(toppath, "patches", dname)
+    patchdirs = PatchDirs(dname)
 
     # create output directory
     if not os.path.isdir(pwxmldirout):
@@ -119,9 +296,11 @@ def RunFiltersDir(FILTERfunction, dname, options, forcereparse):
     # make the list of days which we will iterate through (in revers date order)
     daydates = sorted(daymap, reverse=True)
 
-    # loop through file in input directory in reverse date order and build up the
+    # work out which files need parsing. A day is only looked at again if
+    # one of its files or their patches has changed since it was last parsed
+    manifest = FilterManifest(manifestfile)
+    days = []
     for sdate in daydates:
-        newday = 0
         # skip dates outside the range specified on the command line
         if sdate < options.datefrom or sdate > options.dateto:
             continue
@@ -129,106 +308,76 @@ def RunFiltersDir(FILTERfunction, dname, options, forcereparse):
         fdaycs = daymap[sdate]
         fdaycs.sort()
 
-        # detect if there is a change in date on any of them, which will
-        # require force reparse on whole day to keep the "latest" flag up to date.
-        # this is happening due to over-writes on the today pages
-        bmodifiedoutoforder = None
-        for fdayc in fdaycs:
-            fin = fdayc[2]
-            jfin = os.path.join(pwcmdirin, fdayc[2])
-            jfout = os.path.join(
-                pwxmldirout, re.match("(.*\.)(html|json)$", fin).group(1) + "xml"
-            )
-            patchfile = findpatchfile(fin, newpwpatchesdir, pwpatchesdir)
-            if os.path.isfile(jfout):
-                out_modified = os.stat(jfout).st_mtime
-                in_modified = os.stat(jfin).st_mtime
-                if in_modified > out_modified:
-                    bmodifiedoutoforder = fin
-                if patchfile and os.path.isfile(patchfile):
-                    patch_modified = os.stat(patchfile).st_mtime
-                    if patch_modified > out_modified:
-                        bmodifiedoutoforder = fin
-        if bmodifiedoutoforder:
-            print(
-                "input or patch modified since output reparsing ", bmodifiedoutoforder
-            )
-
-        # now we parse these files -- in order -- to accumulate their catalogue of diffs
-        xprev = None  # previous xml file from which we check against diffs, and its version string
+        dayfiles = []
         for fdayc in fdaycs:
             fin = fdayc[2]
             jfin = os.path.join(pwcmdirin, fin)
-            sdatever = fdayc[1]
-
-            # here we repeat the parsing and run the patchtool editor until this file goes through.
-            # create the output file name
             jfout = os.path.join(
                 pwxmldirout, re.match("(.*\.)(html|json)$", fin).group(1) + "xml"
             )
-            patchfile = findpatchfile(fin, newpwpatchesdir, pwpatchesdir)
-
-            # skip already processed files, if date is earler and it's not a forced reparse
-            # (checking output date against input and patchfile, if there is one)
-            bparsefile = (
-                not os.path.isfile(jfout) or forcereparse or bmodifiedoutoforder
+            patchfile = findpatchfile(fin, *patchdirs)
+            bparsefile = forcereparse or not manifest.unchanged(
+                dname, fin, jfin, patchfile, jfout
             )
-
-            while (
-                bparsefile
-            ):  # flag is being used acually as if bparsefile: while True:
-                try:
-                    RunFilterFile(
-                        FILTERfunction,
-                        xprev,
-                        sdate,
-                        sdatever,
-                        dname,
-                        jfin,
-                        patchfile,
-                        jfout,
-                        options.quietc,
-                    )
-
-                    # update the list of files which have been changed
-                    # (don't see why it can't be determined by the modification time on the file)
-                    # (-- because rsync is crap, and different computers have different clocks)
-                    newlistf = os.path.join(pwxmldirout, changedatesfile)
-                    fil = open(newlistf, "a+")
+            dayfiles.append((fin, jfin, jfout, patchfile, fdayc[1], bparsefile))
+        if any(dayfile[-1] for dayfile in dayfiles):
+            days.append((sdate, dayfiles))
+
+    # Days are independent of each other, so can be parsed in several
+    # processes at once, but not when the patchtool is going to be run
+    if options.jobs > 1 and not options.patchtool and len(days) > 1:
+        context = multiprocessing.get_context("fork")
+        pool = ProcessPoolExecutor(
+            max_workers=options.jobs,
+            mp_context=context,
+            initializer=StartWorker,
+            initargs=(options.profiles,),
+        )
+        workeroptions = copy.copy(options)
+        workeroptions.profiles = None
+        futures = [
+            pool.submit(
+                RunFiltersDay, FILTERfunction, dname, sdate, dayfiles, workeroptions
+            )
+            for sdate, dayfiles in days
+        ]
+        results = (future.result() for future in futures)
+    else:
+        pool = None
+        results = (
+            RunFiltersDay(FILTERfunction, dname, sdate, dayfiles, options)
+            for sdate, dayfiles in days
+        )
+
+    try:
+        for (sdate, dayfiles), (parsed, ce) in zip(days, results):
+            # update the list of files which have been changed
+            # (don't see why it can't be determined by the modification time on the file)
+            # (-- because rsync is crap, and different computers have different clocks)
+            newlistf = os.path.join(pwxmldirout, changedatesfile)
+            fil = open(newlistf, "a+")
+            for fin, jfin, jfout, patchfile, sdatever, bparsefile in dayfiles:
+                if fin in parsed:
                     fil.write("%d,%s\n" % (time.time(), os.path.split(jfout)[1]))
-                    fil.close()
-                    break
-
-                # exception cases which cause the loop to continue
-                except ContextException as ce:
-                    if options.patchtool:
-                        # deliberately don't set options.anyerrors (as they are to fix it!)
-                        print("runfilters.py", ce)
-                        RunPatchTool(dname, (sdate + sdatever), ce)
-                        # find file again, in case new
-                        patchfile = findpatchfile(fin, newpwpatchesdir, pwpatchesdir)
-                        continue  # emphasise that this is the repeat condition
-
-                    elif options.quietc:
-                        options.anyerrors = True
-                        print(ce.description)
-                        print(
-                            "\tERROR! %s failed on %s, quietly moving to next day"
-                            % (dname, sdate)
-                        )
-                        newday = 1
-                        # sys.exit(1) # remove this and it will continue past an exception (but then keep throwing the same tired errors)
-                        break  # leave the loop having not written the xml file; go onto the next day
-
-                    # reraise case (used for parser development), so we can get a stackdump and end
-                    else:
-                        options.anyerrors = True
-                        raise
-
-            # endwhile
-            if newday:
-                break
-            xprev = (jfout, sdatever)
+                    manifest.add(dname, fin, jfin, findpatchfile(fin, *patchdirs))
+            fil.close()
+
+            if ce is None:
+                continue
+            options.anyerrors = True
+            if options.quietc:
+                print(ce.description)
+                print(
+                    "\tERROR! %s failed on %s, quietly moving to next day"
+                    % (dname, sdate)
+                )
+            # reraise case (used for parser development), so we can get a stackdump and end
+            else:
+                raise ce
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        manifest.close()
 
 
 def FixExtraColNumParas(text):
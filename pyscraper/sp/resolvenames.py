@@ -3,7 +3,7 @@ import json
 import os
 import re
 
-from base_resolver import ResolverBase
+from base_resolver import LazyResolver, ResolverBase
 
 members_dir = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "../..", "members")
@@ -23,7 +23,18 @@ class MemberList(ResolverBase):
 
     # FIXME: use Set instead of lists
 
+    # The answers only depend on the arguments and the loaded data, so are
+    # cached; the lists are copied so callers can't change the stored ones.
     def match_whole_speaker(self, speaker_name, speaker_date):
+        ids = self.lookup_cache.fetch(
+            ("match_whole_speaker", speaker_name, speaker_date),
+            self._match_whole_speaker,
+            speaker_name,
+            speaker_date,
+        )
+        return list(ids) if isinstance(ids, list) else ids
+
+    def _match_whole_speaker(self, speaker_name, speaker_date):
         # lfp = codecs.open("/var/tmp/all-names",'a','utf-8')
         # lfp.write("%s\t%s\n"%(speaker_date,speaker_name))
         # lfp.close()
@@ -121,6 +132,17 @@ class MemberList(ResolverBase):
     # FIXME: use Set instead of lists
 
     def match_string_somehow(self, s, date, party, just_name):
+        ids = self.lookup_cache.fetch(
+            ("match_string_somehow", s, date, party, just_name),
+            self._match_string_somehow,
+            s,
+            date,
+            party,
+            just_name,
+        )
+        return list(ids) if isinstance(ids, list) else ids
+
+    def _match_string_somehow(self, s, date, party, just_name):
         s = re.sub("\s{2,}", " ", s)
 
         s = s.replace("O\u2019", "O'")
@@ -163,9 +185,7 @@ class MemberList(ResolverBase):
 
         fullname_matches = self.fullnames.get(s)
         if fullname_matches:
-            for m in fullname_matches:
-                if date and date < m["start_date"] or date > m["end_date"]:
-                    continue
+            for m in fullname_matches.on(date):
                 # get the full membership details so we can check the start_reason
                 mem = self.members.get(m["id"])
                 if (
@@ -205,9 +225,7 @@ class MemberList(ResolverBase):
 
             fullname_matches = self.fullnames.get(rest_of_name)
             if fullname_matches:
-                for m in fullname_matches:
-                    if date and date < m["start_date"] or date > m["end_date"]:
-                        continue
+                for m in fullname_matches.on(date):
                     if m["id"] not in member_ids:
                         member_ids.append(m["id"])
                 if len(member_ids) == 1:
@@ -219,9 +237,7 @@ class MemberList(ResolverBase):
             if re.match("^[^ ]+$", rest_of_name):
                 lastname_matches = self.lastnames.get(rest_of_name)
                 if lastname_matches:
-                    for m in lastname_matches:
-                        if date and date < m["start_date"] or date > m["end_date"]:
-                            continue
+                    for m in lastname_matches.on(date):
                         if m["id"] not in member_ids:
                             member_ids.append(m["id"])
                     if len(member_ids) == 1:
@@ -233,9 +249,7 @@ class MemberList(ResolverBase):
                 for c in constituency_matches:
                     # print "       Got constituency id: "+c['id']
                     members = self.considtomembermap.get(c["id"])
-                    for m in members:
-                        if date and date < m["start_date"] or date > m["end_date"]:
-                            continue
+                    for m in members.on(date):
                         if m["id"] not in member_ids:
                             member_ids.append(m["id"])
                     if len(member_ids) == 1:
@@ -287,4 +301,4 @@ class MemberList(ResolverBase):
         return ids
 
 
-memberList = MemberList()
+memberList = LazyResolver(MemberList)
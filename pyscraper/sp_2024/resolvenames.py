@@ -2,31 +2,29 @@ import datetime
 import json
 import os
 import re
-from functools import lru_cache
-from pathlib import Path
+import sys
 from typing import Iterable, Optional, TypeVar
 
-from mysoc_validator import Popolo
 from mysoc_validator.models.popolo import IdentifierScheme
 
-from ..base_resolver import ResolverBase
 from .common import non_tag_data_in, tidy_string
 
+# imported the same way as by the parsers, so there is only the one copy of
+# the module and of the people.json it has loaded
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from base_resolver import (
+    DateIndex,
+    LazyResolver,
+    ResolverBase,
+    date_ordinal,
+    get_popolo,
+)
+
 members_dir = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "../..", "members")
 )
 
 
-@lru_cache
-def get_popolo():
-    """
-    Load the Popolo data from the members directory.
-    """
-    popolo_path = Path(members_dir) / "people.json"
-    popolo = Popolo.from_path(popolo_path)
-    return popolo
-
-
 def twfy_id_from_scot_parl_id(scot_parl_id: str) -> Optional[str]:
     """
     Convert a Scottish Parliament ID to a TheyWorkForYou ID.
@@ -63,7 +61,18 @@ class MemberList(ResolverBase):
 
     # FIXME: use Set instead of lists
 
+    # The answers only depend on the arguments and the loaded data, so are
+    # cached; the lists are copied so callers can't change the stored ones.
     def match_whole_speaker(self, speaker_name, speaker_date):
+        ids = self.lookup_cache.fetch(
+            ("match_whole_speaker", speaker_name, speaker_date),
+            self._match_whole_speaker,
+            speaker_name,
+            speaker_date,
+        )
+        return list(ids) if isinstance(ids, list) else ids
+
+    def _match_whole_speaker(self, speaker_name, speaker_date):
         # lfp = codecs.open("/var/tmp/all-names",'a','utf-8')
         # lfp.write("%s\t%s\n"%(speaker_date,speaker_name))
         # lfp.close()
@@ -164,6 +173,17 @@ class MemberList(ResolverBase):
     # FIXME: use Set instead of lists
 
     def match_string_somehow(self, s, date, party, just_name):
+        ids = self.lookup_cache.fetch(
+            ("match_string_somehow", s, date, party, just_name),
+            self._match_string_somehow,
+            s,
+            date,
+            party,
+            just_name,
+        )
+        return list(ids) if isinstance(ids, list) else ids
+
+    def _match_string_somehow(self, s, date, party, just_name):
         # in the str '2. Sarah Boyack (Lothian) (Lab)' we want to remove the '2. ' bit
         s = re.sub(r"^\d+\.\s", "", s)
 
@@ -196,12 +216,10 @@ class MemberList(ResolverBase):
             office_name = s.replace("The ", "")
             office_matches = self.offices.get(office_name)
             if office_matches:
-                for o in office_matches:
-                    if date and (
-                        date < o["start_date"]
-                        or "end_date" not in list(o.keys())
-                        or date >= o["end_date"]
-                    ):
+                day = date_ordinal(date)
+                for o, (start, end) in zip(office_matches, office_matches.spans()):
+                    # offices are held until the day before they end
+                    if date and (day < start or "end_date" not in o or day >= end):
                         continue
                     member_ids.append(o["person_id"])
                 if len(member_ids) == 1:
@@ -209,9 +227,7 @@ class MemberList(ResolverBase):
 
         fullname_matches = self.fullnames.get(s)
         if fullname_matches:
-            for m in fullname_matches:
-                if date and date < m["start_date"] or date > m["end_date"]:
-                    continue
+            for m in fullname_matches.on(date):
                 # get the full membership details so we can check the start_reason
                 mem = self.members.get(m["id"])
                 if (
@@ -251,9 +267,7 @@ class MemberList(ResolverBase):
 
             fullname_matches = self.fullnames.get(rest_of_name)
             if fullname_matches:
-                for m in fullname_matches:
-                    if date and date < m["start_date"] or date > m["end_date"]:
-                        continue
+                for m in fullname_matches.on(date):
                     if m["id"] not in member_ids:
                         member_ids.append(m["id"])
                 if len(member_ids) == 1:
@@ -265,9 +279,7 @@ class MemberList(ResolverBase):
             if re.match("^[^ ]+$", rest_of_name):
                 lastname_matches = self.lastnames.get(rest_of_name)
                 if lastname_matches:
-                    for m in lastname_matches:
-                        if date and date < m["start_date"] or date > m["end_date"]:
-                            continue
+                    for m in lastname_matches.on(date):
                         if m["id"] not in member_ids:
                             member_ids.append(m["id"])
                     if len(member_ids) == 1:
@@ -279,9 +291,7 @@ class MemberList(ResolverBase):
                 for c in constituency_matches:
                     # print "       Got constituency id: "+c['id']
                     members = self.considtomembermap.get(c["id"])
-                    for m in members:
-                        if date and date < m["start_date"] or date > m["end_date"]:
-                            continue
+                    for m in members.on(date):
                         if m["id"] not in member_ids:
                             member_ids.append(m["id"])
                     if len(member_ids) == 1:
@@ -311,16 +321,12 @@ class MemberList(ResolverBase):
             offices = json.loads(offices_json)
 
         for office in offices:
-            self.offices.setdefault(office["role"], []).append(office)
+            self.offices.setdefault(office["role"], DateIndex()).append(office)
 
     def list(self, date=None):
         if not date:
             date = datetime.date.today().isoformat()
-        ids = []
-        for m in self.members.values():
-            if "start_date" in m and date >= m["start_date"] and date <= m["end_date"]:
-                ids.append(m["id"])
-        return ids
+        return [m["id"] for m in self.members_on(date) if "start_date" in m]
 
     def list_all_dates(self):
         ids = []
@@ -329,7 +335,7 @@ class MemberList(ResolverBase):
         return ids
 
 
-memberList = MemberList()
+memberList = LazyResolver(MemberList)
 
 
 member_vote_re = re.compile(
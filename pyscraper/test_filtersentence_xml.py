@@ -0,0 +1,83 @@
+#! /usr/bin/env python3
+
+# Checks that tokenizing paragraphs in one pass along them, as PhraseTokenize
+# does, gives the same tokens as going through the chain of tokens in turn
+# with TokenizePhraseRecurse. Run with
+#
+#   python -m unittest test_filtersentence_xml
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from filtersentence_xml import PhraseTokenize
+
+# paragraphs with each kind of token, and tokens that overlap or sit next to
+# each other, so the precedence between them is checked too
+PARAGRAPHS = [
+    "As I said on 3 March 2009, and again on Tuesday, 10 March 2009, we will act.",
+    "<i>Official Report</i>, 3 March 2009; Vol. 489, c. 123W and the day before.",
+    "<i>Official Report</i>, House of Lords, 12/1/2005, col. 45WA.",
+    "On 4 June 2008, <i>Official Report</i>, column 567, I set out the position.",
+    "See 4 June 2008 and <i>Official Report</i>, Commons, c 12-14WH, 5 June.",
+    "Under Standing Order No. 24 (Emergency debates) and Standing Order No. 14(1).",
+    "<b>Standing Order No. 83A(7)</b> applies on 1 May 2010.",
+    "Details are at http://www.parliament.uk/documents/ and https://example.com/a.",
+    'Copies are at <a href="http://example.com/x.pdf">http://example.com/x.pdf</a>.',
+    '<small><a href="http://example.com/y">the letter</a></small> of 2 April 2001.',
+    "Quoted 'http://example.com/q' and \"https://example.com/r\" are left alone.",
+    "the hon. Member for Sedgefield (Mr. Blair) spoke on 27 June 2007.",
+    "the right hon. and learned Member for Holborn and St. Pancras (Keir Starmer)",
+    "the hon. Member for http://example.com/ (Mr. Nobody) on Monday 1 January.",
+    "[12345] A question on 3 March 2009.",
+    "Written statement, 3 March 2009, c. 12WS & 4 March 2009 &amp; c. 13WS [678]",
+    "Nothing to see here at all.",
+]
+
+SEEDS = range(200)
+
+
+# pieces of the paragraphs run together, so tokens turn up in other places
+# and next to other tokens
+def mixed_paragraph(seed):
+    rand = random.Random(seed)
+    pieces = []
+    for i in range(rand.randint(2, 5)):
+        para = rand.choice(PARAGRAPHS)
+        start = rand.randrange(len(para))
+        pieces.append(para[start : rand.randint(start, len(para))])
+    return "".join(pieces)
+
+
+def tokenize(stex, singlepass):
+    saved = PhraseTokenize.singlepass
+    PhraseTokenize.singlepass = singlepass
+    try:
+        tokens = PhraseTokenize("2010-01-01", stex)
+        return tokens.toklist, tokens.lastdate, tokens.GetPara()
+    except Exception as e:
+        return str(e)
+    finally:
+        PhraseTokenize.singlepass = saved
+
+
+class TokenizeTests(unittest.TestCase):
+    def assertSameTokens(self, stex):
+        self.assertEqual(tokenize(stex, True), tokenize(stex, False))
+
+    def test_paragraphs(self):
+        for stex in PARAGRAPHS:
+            with self.subTest(stex=stex):
+                self.assertSameTokens(stex)
+
+    def test_mixed_paragraphs(self):
+        for seed in SEEDS:
+            stex = mixed_paragraph(seed)
+            with self.subTest(stex=stex):
+                self.assertSameTokens(stex)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#! /usr/bin/env python3
+
+# Checks the gid redirects found on made up pairs of versions of a day are
+# the same when each speech is only checked against the matching blocks
+# around it, as DoFactorDiff does, as when checked against every block.
+# Run with
+#
+#   python -m unittest test_gidmatching
+
+import random
+import unittest
+from unittest import mock
+
+import gidmatching
+from new_hansard import ParseDay
+
+WORDS = (
+    "the hon. Member Government policy Minister House Friend will that to of "
+    "and in is it a this what on for has been not be right Bill Order"
+).split()
+
+SEEDS = range(40)
+
+
+def make_speech(rand):
+    paras = []
+    for i in range(rand.randint(1, 4)):
+        paras.append(" ".join(rand.choice(WORDS) for j in range(rand.randint(3, 30))))
+    return (rand.choice(["10001", "10002", "10003", "10004"]), paras)
+
+
+def make_day(rand):
+    return [make_speech(rand) for i in range(rand.randint(20, 80))]
+
+
+# change the day about the way a later scrape of it might
+def make_revision(rand, day):
+    day = [(speaker, list(paras)) for speaker, paras in day]
+    for n in range(rand.randint(1, 8)):
+        i = rand.randrange(len(day))
+        change = rand.choice(["edit", "edit", "delete", "insert", "move", "split"])
+        speaker, paras = day[i]
+        if change == "edit":
+            p = rand.randrange(len(paras))
+            words = paras[p].split()
+            words[rand.randrange(len(words))] = rand.choice(WORDS)
+            paras[p] = " ".join(words)
+        elif change == "delete" and len(day) > 1:
+            del day[i]
+        elif change == "insert":
+            day.insert(i, make_speech(rand))
+        elif change == "move":
+            day.insert(rand.randrange(len(day)), day.pop(i))
+        elif change == "split" and len(paras) > 1:
+            day[i : i + 1] = [(speaker, paras[:1]), (speaker, paras[1:])]
+    return day
+
+
+def day_xml(day):
+    xml = ['<publicwhip scraperversion="a" latest="yes">\n']
+    for i, (speaker, paras) in enumerate(day):
+        gid = "uk.org.publicwhip/debate/2006-03-15a.100.%d" % i
+        xml.append(
+            '<speech id="%s" person_id="uk.org.publicwhip/person/%s" colnum="100">\n'
+            % (gid, speaker)
+        )
+        for p, para in enumerate(paras):
+            xml.append('<p pid="a100.%d/%d">%s</p>\n' % (i, p + 1, para))
+        xml.append("</speech>\n")
+    xml.append("</publicwhip>\n")
+    return "".join(xml)
+
+
+def versions(seed):
+    rand = random.Random(seed)
+    day = make_day(rand)
+    return day_xml(day), day_xml(make_revision(rand, day))
+
+
+class RedirectTests(unittest.TestCase):
+    def setUp(self):
+        self.parser = ParseDay()
+
+    def redirects(self, seed):
+        xprevs, xcur = versions(seed)
+        return self.parser.diff_versions(xprevs, xcur)
+
+    def test_same_as_every_block(self):
+        for seed in SEEDS:
+            with self.subTest(seed=seed):
+                redirects = self.redirects(seed)
+                # starting from the first block for every speech
+                with mock.patch.object(
+                    gidmatching.bisect, "bisect_right", lambda a, x: 0
+                ):
+                    self.assertEqual(redirects, self.redirects(seed))
+
+
+if __name__ == "__main__":
+    unittest.main()
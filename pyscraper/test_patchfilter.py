@@ -0,0 +1,143 @@
+#! /usr/bin/env python3
+
+# Applies some patches of the kinds patchtool.py makes with patchfilter,
+# checking they give what patch(1) gives. Run with
+#
+#   python -m unittest test_patchfilter
+
+import os
+import tempfile
+import unittest
+
+from patchfilter import ApplyPatch, ApplyPatchFile, PatchError
+
+DAY = b"one\ntwo\nthree\nfour\nfive\nsix\nseven\n"
+
+CHANGE_FOUR = b"""--- a
++++ b
+@@ -1,7 +1,7 @@
+ one
+ two
+ three
+-four
++FOUR
+ five
+ six
+ seven
+"""
+
+
+class ApplyPatchTests(unittest.TestCase):
+    def test_change(self):
+        self.assertEqual(
+            ApplyPatch(DAY, CHANGE_FOUR), b"one\ntwo\nthree\nFOUR\nfive\nsix\nseven\n"
+        )
+
+    def test_offset_hunk(self):
+        # the lines have moved down since the patch was made
+        self.assertEqual(
+            ApplyPatch(b"new\nlines\n" + DAY, CHANGE_FOUR),
+            b"new\nlines\none\ntwo\nthree\nFOUR\nfive\nsix\nseven\n",
+        )
+
+    def test_offset_carried_on(self):
+        patch = b"""--- a
++++ b
+@@ -1,3 +1,3 @@
+ one
+-two
++TWO
+ three
+@@ -5,3 +5,3 @@
+ five
+-six
++SIX
+ seven
+"""
+        self.assertEqual(
+            ApplyPatch(b"zero\n" + DAY, patch),
+            b"zero\none\nTWO\nthree\nfour\nfive\nSIX\nseven\n",
+        )
+
+    def test_insert_hunk(self):
+        patch = b"""--- a
++++ b
+@@ -2,0 +3 @@
++and a half
+"""
+        self.assertEqual(
+            ApplyPatch(b"one\ntwo\nthree\n", patch), b"one\ntwo\nand a half\nthree\n"
+        )
+
+    def test_insert_at_start(self):
+        patch = b"""--- a
++++ b
+@@ -0,0 +1 @@
++new
+"""
+        self.assertEqual(
+            ApplyPatch(b"one\ntwo\nthree\n", patch), b"new\none\ntwo\nthree\n"
+        )
+
+    def test_no_newline_at_end(self):
+        patch = b"""--- a
++++ b
+@@ -1,3 +1,3 @@
+ one
+ two
+-three
+\\ No newline at end of file
++THREE
+\\ No newline at end of file
+"""
+        self.assertEqual(ApplyPatch(b"one\ntwo\nthree", patch), b"one\ntwo\nTHREE")
+
+    def test_newline_added_at_end(self):
+        patch = b"""--- a
++++ b
+@@ -1,3 +1,4 @@
+ one
+ two
+-three
+\\ No newline at end of file
++three
++four
+"""
+        self.assertEqual(
+            ApplyPatch(b"one\ntwo\nthree", patch), b"one\ntwo\nthree\nfour\n"
+        )
+
+    def test_does_not_apply(self):
+        with self.assertRaises(PatchError):
+            ApplyPatch(DAY.replace(b"four", b"4"), CHANGE_FOUR)
+
+    def test_cut_short(self):
+        with self.assertRaises(PatchError):
+            ApplyPatch(DAY, CHANGE_FOUR[:-12])
+
+
+class ApplyPatchFileTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(DAY)
+        fd, self.patchfile = tempfile.mkstemp(".patch")
+        os.close(fd)
+        self.addCleanup(os.remove, self.filename)
+        self.addCleanup(os.remove, self.patchfile)
+
+    def write_patch(self, patch, mtime):
+        with open(self.patchfile, "wb") as f:
+            f.write(patch)
+        os.utime(self.patchfile, ns=(mtime, mtime))
+
+    def test_patch_file_changed(self):
+        self.write_patch(CHANGE_FOUR, 1000000000)
+        self.assertIn(b"FOUR", ApplyPatchFile(self.filename, self.patchfile))
+        # the hunks are read again once the patch file has changed
+        self.write_patch(CHANGE_FOUR.replace(b"FOUR", b"4"), 2000000000)
+        self.assertIn(b"\n4\n", ApplyPatchFile(self.filename, self.patchfile))
+
+
+if __name__ == "__main__":
+    unittest.main()
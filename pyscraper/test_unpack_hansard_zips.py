@@ -0,0 +1,200 @@
+#! /usr/bin/env python3
+
+# Runs the fetching of zips from the Hansard feed against a local stand-in
+# for the feed server, checking what ends up in the zip directory and in
+# hansardfeed.json. Run with
+#
+#   python -m unittest test_unpack_hansard_zips
+
+import contextlib
+import http.server
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+import zipfile
+from os.path import exists, join
+from unittest import mock
+
+import unpack_hansard_zips
+
+FEED = """<feed xmlns="http://www.w3.org/2005/Atom">%s</feed>"""
+ENTRY = """<entry><id>http://example.com/%(id)d.zip</id>
+<updated>%(updated)s</updated><link href="%(url)s/%(id)d.zip"/></entry>"""
+
+
+# big enough that some of it is written out before a download is cut off
+def make_zip(text):
+    f = io.BytesIO()
+    with zipfile.ZipFile(f, "w") as z:
+        z.writestr("CHAN_2024-01-01.xml", text * 50000)
+    return f.getvalue()
+
+
+# Serves the files from server.files, noting the path and Range header of
+# each request in server.requests, and cutting off the first response for
+# any path in server.cut half way through
+class FeedHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        data = self.server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        requested = self.headers.get("Range")
+        self.server.requests.append((self.path, requested))
+
+        start = 0
+        if requested:
+            start = int(re.match(r"bytes=(\d+)-$", requested).group(1))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.path in self.server.cut:
+            self.server.cut.discard(self.path)
+            body = body[: len(body) // 2]
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FetchTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.zip_directory = join(self.directory, "hansardzips")
+        self.index_filename = join(self.directory, "hansardfeed.json")
+        for name, value in (
+            ("zip_directory", self.zip_directory),
+            ("json_index_filename", self.index_filename),
+        ):
+            patcher = mock.patch.object(unpack_hansard_zips, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+        self.server.files = {}
+        self.server.requests = []
+        self.server.cut = set()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+
+        self.zips = {101: make_zip("first"), 102: make_zip("second")}
+        self.server.files["/101.zip"] = self.zips[101]
+        self.server.files["/102.zip"] = self.zips[102]
+        self.server.files["/feed"] = (
+            FEED
+            % "".join(
+                ENTRY
+                % {"id": id, "updated": "2024-01-0%dT10:00:00Z" % n, "url": self.url}
+                for n, id in enumerate(sorted(self.zips), 1)
+            )
+        ).encode()
+
+    # runs the script, giving its exit code
+    def run_script(self):
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+                unpack_hansard_zips.main(["--feed-url", self.url + "/feed", "-j", "2"])
+        except SystemExit as e:
+            return e.code
+        return 0
+
+    def statuses(self):
+        with open(self.index_filename) as f:
+            return {e["id"]: e.get("status") for e in json.load(f)}
+
+    def zip_filename(self, id):
+        return join(self.zip_directory, "%d_2024-01-0%d_10:00:00.zip" % (id, id - 100))
+
+    def assertFetched(self, id):
+        with open(self.zip_filename(id), "rb") as f:
+            self.assertEqual(f.read(), self.zips[id])
+        self.assertFalse(exists(self.zip_filename(id) + ".part"))
+
+    def test_fresh_download(self):
+        self.assertEqual(self.run_script(), 0)
+        self.assertFetched(101)
+        self.assertFetched(102)
+        self.assertEqual(self.statuses(), {101: "downloaded", 102: "downloaded"})
+        self.assertIn(("/101.zip", None), self.server.requests)
+
+        # nothing is fetched again on the next run
+        del self.server.requests[:]
+        self.assertEqual(self.run_script(), 0)
+        self.assertEqual(self.server.requests, [("/feed", None)])
+
+    def test_resume_part(self):
+        self.server.cut.add("/101.zip")
+        self.assertEqual(self.run_script(), 1)
+        self.assertEqual(self.statuses(), {101: "failed", 102: "downloaded"})
+        part_size = os.path.getsize(self.zip_filename(101) + ".part")
+        self.assertTrue(0 < part_size < len(self.zips[101]))
+
+        # the rest is asked for, and given as a 206
+        self.assertEqual(self.run_script(), 0)
+        self.assertIn(("/101.zip", "bytes=%d-" % part_size), self.server.requests)
+        self.assertFetched(101)
+        self.assertEqual(self.statuses(), {101: "downloaded", 102: "downloaded"})
+
+    def test_complete_part(self):
+        # as if it stopped after the download but before the zip was checked
+        os.makedirs(self.zip_directory)
+        with open(self.zip_filename(101) + ".part", "wb") as f:
+            f.write(self.zips[101])
+
+        self.assertEqual(self.run_script(), 0)
+        self.assertIn(
+            ("/101.zip", "bytes=%d-" % len(self.zips[101])), self.server.requests
+        )
+        self.assertFetched(101)
+        self.assertEqual(self.statuses(), {101: "downloaded", 102: "downloaded"})
+
+    def test_corrupt_zip(self):
+        corrupt = bytearray(self.zips[101])
+        corrupt[100] ^= 0xFF
+        self.server.files["/101.zip"] = bytes(corrupt)
+
+        self.assertEqual(self.run_script(), 1)
+        self.assertFalse(exists(self.zip_filename(101)))
+        self.assertFalse(exists(self.zip_filename(101) + ".part"))
+        self.assertEqual(self.statuses(), {101: "failed", 102: "downloaded"})
+
+    def test_crash(self):
+        download_entry = unpack_hansard_zips.download_entry
+
+        def crashing_download(entry):
+            if entry["id"] == 101:
+                raise RuntimeError("crashed")
+            return download_entry(entry)
+
+        with mock.patch.object(
+            unpack_hansard_zips, "download_entry", crashing_download
+        ):
+            self.assertEqual(self.run_script(), 1)
+        # left as it was when it stopped, so it is tried again next time
+        self.assertEqual(self.statuses(), {101: "downloading", 102: "downloaded"})
+
+        self.assertEqual(self.run_script(), 0)
+        self.assertFetched(101)
+        self.assertEqual(self.statuses(), {101: "downloaded", 102: "downloaded"})
+
+
+if __name__ == "__main__":
+    unittest.main()
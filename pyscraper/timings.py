@@ -0,0 +1,209 @@
+#! /usr/bin/env python3
+
+# Records how long each stage of an update takes, so that when the morning
+# update overruns it's possible to see where the time went.
+#
+# If PARLPARSE_TIMINGS is set to a filename, a JSON object is appended to it
+# for each file handled, e.g.
+#   {"file": "..._CHAN_2024-01-09.xml", "seconds": 3.2, "rss": 183456,
+#    "stages": {"parse": 2.9, "resolve": 0.4, "diff": 0.1, "write": 0.2}, ...}
+# where the stages are those the script goes through for a file (resolve is
+# the part of parse spent matching names), and rss is the peak resident set
+# size of the process so far, in KB. Run as a script, it runs a command and
+# appends one for the whole command, which is how the update scripts time
+# each of the things they run:
+#   ./timings.py process_hansard ./process_hansard.py --from=...
+#
+# Scripts that take --profile also run cProfile over each file, keeping the
+# output for the slowest few as <profile directory>/<file>.prof, which can
+# be looked at with python -m pstats.
+
+import cProfile
+import datetime
+import heapq
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from os.path import basename, join
+
+log_filename = os.environ.get("PARLPARSE_TIMINGS")
+
+# the timer for the file being handled, kept per thread
+state = threading.local()
+
+
+def peak_rss(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss
+
+
+def write(record):
+    if not log_filename:
+        return
+    record["at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    record["script"] = basename(sys.argv[0])
+    record["pid"] = os.getpid()
+    # lines are appended in a single write, so processes logging to the
+    # same file at once don't get mixed up
+    with open(log_filename, "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+class FileTimer(object):
+    def __init__(self, filename, **fields):
+        self.filename = filename
+        self.fields = fields
+        self.stages = {}
+        self.counts = {}
+        self.start = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0) + seconds
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def seconds(self):
+        return time.perf_counter() - self.start
+
+    def record(self, **fields):
+        record = dict(self.fields, **fields)
+        record.update(
+            {
+                "file": self.filename,
+                "seconds": round(self.seconds(), 4),
+                "stages": {k: round(v, 4) for k, v in self.stages.items()},
+                "counts": self.counts,
+                "rss": peak_rss(),
+            }
+        )
+        write(record)
+
+
+# Stands in for a FileTimer when there is nowhere to write the timings
+class NoTimer(object):
+    def record(self, **fields):
+        pass
+
+
+# Times a file, making it the one that stage() and count() add to. Nothing
+# is timed unless there is somewhere to write the timings to.
+@contextmanager
+def timing(filename, **fields):
+    if not log_filename:
+        yield NoTimer()
+        return
+    timer = FileTimer(filename, **fields)
+    previous = getattr(state, "timer", None)
+    state.timer = timer
+    try:
+        yield timer
+    finally:
+        state.timer = previous
+
+
+def active():
+    return getattr(state, "timer", None) is not None
+
+
+@contextmanager
+def stage(name):
+    timer = getattr(state, "timer", None)
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    timer = getattr(state, "timer", None)
+    if timer is not None:
+        timer.count(name, n)
+
+
+# An object standing in for another, timing calls of its methods as a stage.
+# The results of the methods named in wrap_results are stood in for in turn,
+# so that calls on them are timed as part of the same stage.
+class TimedCalls(object):
+    def __init__(self, wrapped, stage_name, wrap_results=()):
+        self.wrapped = wrapped
+        self.stage_name = stage_name
+        self.wrap_results = wrap_results
+
+    def __getattr__(self, name):
+        value = getattr(self.wrapped, name)
+        if not callable(value):
+            return value
+
+        def timed(*args, **kwargs):
+            count(self.stage_name)
+            with stage(self.stage_name):
+                result = value(*args, **kwargs)
+            if name in self.wrap_results:
+                result = TimedCalls(result, self.stage_name)
+            return result
+
+        return timed
+
+
+# Profiles files, keeping the output for the slowest. Each is written out
+# as soon as it's among the slowest seen so far and removed if a slower one
+# pushes it out, so nothing is needed at the end of a run. With several
+# processes, each keeps its own slowest.
+class SlowestProfiles(object):
+    def __init__(self, directory, keep=5):
+        self.directory = directory
+        self.keep = keep
+        self.slowest = []
+        os.makedirs(directory, exist_ok=True)
+
+    def filename(self, name):
+        return join(self.directory, re.sub(r"[^\w.-]+", "_", name) + ".prof")
+
+    @contextmanager
+    def profile(self, name):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.add(name, time.perf_counter() - start, profiler)
+
+    def add(self, name, seconds, profiler):
+        if len(self.slowest) >= self.keep:
+            if seconds <= self.slowest[0][0]:
+                return
+            _, dropped = heapq.heappop(self.slowest)
+            if os.path.exists(dropped):
+                os.remove(dropped)
+        filename = self.filename(name)
+        profiler.dump_stats(filename)
+        heapq.heappush(self.slowest, (seconds, filename))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("Usage: timings.py STAGE COMMAND [ARG...]")
+    start = time.perf_counter()
+    returncode = subprocess.call(sys.argv[2:])
+    write(
+        {
+            "stage": sys.argv[1],
+            "command": sys.argv[2:],
+            "seconds": round(time.perf_counter() - start, 4),
+            "returncode": returncode,
+            "rss": peak_rss(resource.RUSAGE_CHILDREN),
+        }
+    )
+    sys.exit(returncode)
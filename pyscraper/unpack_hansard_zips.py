@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 
+import argparse
 import datetime
 import errno
 import json
 import os
 import re
 import subprocess
+import sys
+import threading
+import traceback
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from os.path import exists, isdir, join
-from tempfile import NamedTemporaryFile
 
 import requests
+import timings
 from lxml import etree
 from miscfuncs import toppath
 
@@ -68,28 +74,42 @@ def entry_key(entry):
     return "|".join(str(entry[k]) for k in ("entry_updated", "id"))
 
 
-# Load the existing entries:
+# The existing entries, with any that weren't already in the feed added
+def load_entries(feed_url):
+    if exists(json_index_filename):
+        with open(json_index_filename) as f:
+            entries = json.load(f)
+    else:
+        entries = []
 
-if exists(json_index_filename):
-    with open(json_index_filename) as f:
-        entries = json.load(f)
-else:
-    entries = []
+    existing_keys = set(entry_key(e) for e in entries)
 
-existing_keys = set(entry_key(e) for e in entries)
+    for new_entry in sorted(
+        get_atom_entries(feed_url), key=lambda e: (e["entry_updated"], e["id"])
+    ):
+        if entry_key(new_entry) not in existing_keys:
+            entries.append(new_entry)
+    return entries
 
-# Now add any entries that weren't already in the feed:
 
-for new_entry in sorted(
-    get_atom_entries(atom_feed_url), key=lambda e: (e["entry_updated"], e["id"])
-):
-    if entry_key(new_entry) not in existing_keys:
-        entries.append(new_entry)
+# The JSON is written out again each time the status of an entry changes,
+# so that a run which stops part way through can be carried on from where
+# it got to:
 
-# Write out the updated JSON:
+index_lock = threading.Lock()
 
-with open(json_index_filename, "w") as f:
-    json.dump(entries, f, indent=4, sort_keys=True)
+
+def save_entries(entries):
+    tmp_filename = json_index_filename + ".tmp"
+    with open(tmp_filename, "w") as f:
+        json.dump(entries, f, indent=4, sort_keys=True)
+    os.replace(tmp_filename, json_index_filename)
+
+
+def set_status(entries, entry, status):
+    with index_lock:
+        entry["status"] = status
+        save_entries(entries)
 
 
 class UnzipError(Exception):
@@ -125,30 +145,147 @@ def extract_zip(zip_filename, destination_directory):
                     print("Unpacking failed for {0}".format(full_subdir))
 
 
-# Now download any new entries and unpack the zip files:
+class DownloadError(Exception):
+    pass
 
-for entry in entries:
-    subdir = join(zip_directory, entry["directory"])
-    if exists(subdir):
-        continue
-    mkdir_p(subdir)
 
-    r = requests.get(entry["link_url"])
-    ntf = NamedTemporaryFile(
-        prefix="{}-".format(entry["id"]), suffix=".zip", delete=False
-    )
-    ntf.write(r.content)
-    ntf.close()
+# Streams an entry's zip to <directory>.zip.part, carrying on from the end
+# of what is there already if the server allows it, and checks the CRCs of
+# the files in it before giving it its proper name
+def download_entry(entry):
+    zip_filename = join(zip_directory, entry["directory"] + ".zip")
+    part_filename = zip_filename + ".part"
+
+    headers = {}
+    if exists(part_filename):
+        headers["Range"] = "bytes={0}-".format(os.path.getsize(part_filename))
+    with requests.get(entry["link_url"], headers=headers, stream=True, timeout=60) as r:
+        # 416 is when the range asked for is past the end, so all of it is
+        # there and it was just never checked
+        if r.status_code != 416:
+            r.raise_for_status()
+            mode = "ab" if r.status_code == 206 else "wb"
+            with open(part_filename, mode) as f:
+                for chunk in r.iter_content(chunk_size=65536):
+                    f.write(chunk)
 
-    print(
-        "Unpacking top level zip file {}, downloaded from {}".format(
-            ntf.name, entry["link_url"]
+    try:
+        with zipfile.ZipFile(part_filename) as z:
+            bad = z.testzip()
+        if bad is not None:
+            raise DownloadError("{0} in the zip is corrupt".format(bad))
+    except zipfile.BadZipFile as e:
+        os.remove(part_filename)
+        raise DownloadError(str(e))
+    except DownloadError:
+        os.remove(part_filename)
+        raise
+
+    os.rename(part_filename, zip_filename)
+    return zip_filename
+
+
+def fetch_entry(entries, entry, unpack):
+    with timings.timing(entry["directory"]) as timer:
+        outcome = fetch_entry_timed(entries, entry, unpack)
+        timer.record(outcome=outcome)
+    return outcome
+
+
+def fetch_entry_timed(entries, entry, unpack):
+    set_status(entries, entry, "downloading")
+    try:
+        with timings.stage("fetch"):
+            zip_filename = download_entry(entry)
+    except (requests.RequestException, DownloadError) as e:
+        print("Downloading failed for {0}: {1}".format(entry["link_url"], e))
+        set_status(entries, entry, "failed")
+        return "failed"
+
+    if unpack:
+        subdir = join(zip_directory, entry["directory"])
+        mkdir_p(subdir)
+        print(
+            "Unpacking top level zip file {}, downloaded from {}".format(
+                zip_filename, entry["link_url"]
+            )
+        )
+        try:
+            with timings.stage("unpack"):
+                extract_zip(zip_filename, subdir)
+            os.remove(zip_filename)
+        except UnzipError:
+            print("Unpacking failed, removing {0}".format(subdir))
+            # shutil.rmtree(subdir)
+            # raise
+    else:
+        print(
+            "Saved zip file {}, downloaded from {}".format(
+                zip_filename, entry["link_url"]
+            )
         )
+    set_status(entries, entry, "downloaded")
+    return "downloaded"
+
+
+def is_fetched(entry):
+    if entry.get("status") not in (None, "downloaded"):
+        return False
+    subdir = join(zip_directory, entry["directory"])
+    return exists(subdir) or exists(subdir + ".zip")
+
+
+# Downloads any new entries, or those that didn't finish last time. Each is
+# kept as <directory>.zip, which process_hansard reads the files from
+# directly, unless they are to be unpacked into <directory>. Returns whether
+# they were all fetched.
+def fetch_entries(entries, jobs, unpack):
+    mkdir_p(zip_directory)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            (entry, pool.submit(fetch_entry, entries, entry, unpack))
+            for entry in entries
+            if not is_fetched(entry)
+        ]
+
+    ok = True
+    for entry, future in futures:
+        try:
+            if future.result() == "failed":
+                ok = False
+        except Exception:
+            print("Fetching failed for {0}:".format(entry["link_url"]))
+            traceback.print_exc()
+            ok = False
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fetch new zips from the Hansard feed."
+    )
+    parser.add_argument(
+        "--unpack",
+        action="store_true",
+        help="unpack each zip into a directory, rather than keeping it to be read from",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=4,
+        help="number of zips to download at once",
     )
+    parser.add_argument(
+        "--feed-url", default=atom_feed_url, help="the atom feed to fetch entries from"
+    )
+    args = parser.parse_args(argv)
 
-    try:
-        extract_zip(ntf.name, subdir)
-    except UnzipError:
-        print("Unpacking failed, removing {0}".format(subdir))
-        # shutil.rmtree(subdir)
-        # raise
+    entries = load_entries(args.feed_url)
+    save_entries(entries)
+    if not fetch_entries(entries, args.jobs, args.unpack):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from base_resolver import ResolverBase
+from base_resolver import LazyResolver, ResolverBase
 
 
 class MemberList(ResolverBase):
@@ -32,4 +32,4 @@ class MemberList(ResolverBase):
         return self.senedd[id]
 
 
-memberList = MemberList()
+memberList = LazyResolver(MemberList)